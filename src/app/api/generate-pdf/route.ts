@@ -1,7 +1,50 @@
 // src/app/api/generate-pdf/route.ts
+import { gzipSync } from 'zlib';
 import { NextRequest, NextResponse } from 'next/server';
 import { createServerClient } from '@/utils/supabase/server';
 
+// A partir deste tamanho o JSON vai comprimido (gzip) para o serviço Python.
+const GZIP_MIN_BYTES = 64 * 1024;
+// Mesmo limite de PDF_STREAM_INGEST_MIN_BYTES no serviço Python: com o corpo
+// comprimido o tamanho recebido por ele não é mais o do JSON, então o proxy
+// pede a leitura sob demanda explicitamente.
+const STREAM_INGEST_MIN_BYTES = 1024 * 1024;
+
+// As seções de linhas (arrays de objetos) vão no formato colunar, um array por
+// campo, sem repetir as chaves em cada linha (ver python_pdf_generator/columnar.py).
+// Só em corpos abaixo de STREAM_INGEST_MIN_BYTES: um campo colunar é lido inteiro
+// pelo serviço Python, enquanto um array de linhas é lido do corpo aos poucos.
+function toColumnar(rows: any[]): Record<string, any[]> | any[] {
+    const isRecord = (v: any) => v !== null && typeof v === 'object' && !Array.isArray(v);
+    if (rows.length === 0 || !rows.every(isRecord)) {
+        return rows;
+    }
+    const keys = new Set<string>();
+    for (const row of rows) {
+        for (const key of Object.keys(row)) {
+            keys.add(key);
+        }
+    }
+    const columns: Record<string, any[]> = {};
+    for (const key of keys) {
+        columns[key] = rows.map((row) => row[key] ?? null);
+    }
+    return columns;
+}
+
+// O serviço Python lê corpos grandes sob demanda (ver python_pdf_generator/ingest.py):
+// com os campos simples (type, title, filename, datas, totais...) antes dos objetos
+// e dos arrays de linhas, as tabelas são lidas do corpo enquanto o PDF é montado.
+function scalarsFirst(value: Record<string, any>): Record<string, any> {
+    const entries = Object.entries(value);
+    const isObject = (v: any) => v !== null && typeof v === 'object';
+    return Object.fromEntries([
+        ...entries.filter(([, v]) => !isObject(v)),
+        ...entries.filter(([, v]) => isObject(v) && !Array.isArray(v)),
+        ...entries.filter(([, v]) => Array.isArray(v)),
+    ]);
+}
+
 export async function POST(req: NextRequest) {
     // 1. Verifica a sessão do usuário logado usando o cliente SSR do Supabase
     const supabase = createServerClient();
@@ -33,15 +76,57 @@ export async function POST(req: NextRequest) {
         console.log(`API Route /api/generate-pdf: Encaminhando requisição para: ${pythonServiceUrl}`);
         
         // Faz a requisição POST para o serviço Python
+        // Repassa o If-None-Match para o serviço Python: se o PDF não mudou, ele
+        // responde 304 sem renderizar nada (o ETag é o hash do conteúdo do relatório).
+        const pythonHeaders: Record<string, string> = { 'Content-Type': 'application/json' };
+        const ifNoneMatch = req.headers.get('If-None-Match');
+        if (ifNoneMatch) {
+            pythonHeaders['If-None-Match'] = ifNoneMatch;
+        }
+
+        // Pede a resposta em streaming (o chamador ainda pode sobrescrever com `stream: false`)
+        const payload = scalarsFirst({ stream: true, ...requestData });
+        const hasContent = payload.content && typeof payload.content === 'object' && !Array.isArray(payload.content);
+        if (hasContent) {
+            payload.content = scalarsFirst(payload.content);
+        }
+
+        let json = JSON.stringify(payload);
+        if (hasContent && Buffer.byteLength(json) < STREAM_INGEST_MIN_BYTES) {
+            // Corpo pequeno: lido de uma vez pelo serviço, então vale o formato colunar (menor)
+            payload.content = Object.fromEntries(
+                Object.entries(payload.content).map(([key, value]) => [key, Array.isArray(value) ? toColumnar(value) : value])
+            );
+            json = JSON.stringify(payload);
+        }
+        const jsonBytes = Buffer.byteLength(json);
+        let body: string | Buffer = json;
+        if (jsonBytes >= STREAM_INGEST_MIN_BYTES) {
+            pythonHeaders['X-PDF-Ingest'] = 'stream';
+        }
+        if (jsonBytes >= GZIP_MIN_BYTES) {
+            body = gzipSync(json, { level: 1 });
+            pythonHeaders['Content-Encoding'] = 'gzip';
+        }
+
+        const proxyStartedAt = Date.now();
         const pythonResponse = await fetch(pythonServiceUrl, {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(requestData),
+            headers: pythonHeaders,
+            body,
         });
         // --- FIM DA REFATORAÇÃO ---
 
+        // Modo assíncrono ("async": true): o serviço responde 202 com o id do job
+        if (pythonResponse.status === 202) {
+            return NextResponse.json(await pythonResponse.json(), { status: 202 });
+        }
+
+        if (pythonResponse.status === 304) {
+            const etag = pythonResponse.headers.get('ETag');
+            return new NextResponse(null, { status: 304, headers: etag ? { ETag: etag } : undefined });
+        }
+
         // Verifica se a resposta do serviço Python foi bem-sucedida
         if (!pythonResponse.ok) {
             const errorText = await pythonResponse.text();
@@ -49,21 +134,32 @@ export async function POST(req: NextRequest) {
             return NextResponse.json({ error: `Python service error: ${errorText}` }, { status: pythonResponse.status });
         }
 
-        // Se a resposta foi OK, processa o blob (o arquivo PDF) e os headers
-        const blob = await pythonResponse.blob();
+        // Se a resposta foi OK, repassa o corpo em streaming: os bytes do PDF seguem
+        // para o navegador à medida que chegam do serviço Python, sem montar um blob.
         const headers = new Headers(pythonResponse.headers);
+        // O fetch já decodifica o corpo e o tamanho pode não ser conhecido (resposta chunked)
+        headers.delete('Content-Encoding');
+        headers.delete('Content-Length');
+        headers.delete('Transfer-Encoding');
+        
+        // O Server-Timing do serviço Python (parse, story, build...) segue para o navegador,
+        // acrescido do tempo até o proxy receber os cabeçalhos da resposta.
+        const upstreamTiming = headers.get('Server-Timing');
+        const proxyTiming = `proxy;dur=${Date.now() - proxyStartedAt}`;
+        headers.set('Server-Timing', upstreamTiming ? `${upstreamTiming}, ${proxyTiming}` : proxyTiming);
         
         const contentDisposition = headers.get('Content-Disposition');
         const filenameMatch = contentDisposition && contentDisposition.match(/filename="([^"]+)"/);
         const filename = filenameMatch ? filenameMatch[1] : 'report.pdf';
 
         headers.set('Content-Disposition', `attachment; filename="${filename}"`);
-        headers.set('Content-Type', 'application/pdf');
+        // Lotes podem voltar como ZIP: só assume PDF se o serviço não informou o tipo
+        headers.set('Content-Type', headers.get('Content-Type') || 'application/pdf');
 
-        console.log(`API Route /api/generate-pdf: PDF gerado com sucesso: ${filename}`);
+        console.log(`API Route /api/generate-pdf: Repassando PDF em streaming: ${filename}`);
 
-        // Retorna a resposta com o blob do PDF e os headers corretos
-        return new NextResponse(blob, {
+        // Retorna a resposta com o corpo (stream) do PDF e os headers corretos
+        return new NextResponse(pythonResponse.body, {
             status: 200,
             headers: headers,
         });
@@ -72,4 +168,41 @@ export async function POST(req: NextRequest) {
         console.error('API Route /api/generate-pdf: Erro ao chamar o serviço Python:', error);
         return NextResponse.json({ error: `Internal server error: ${error.message}` }, { status: 500 });
     }
-}
\ No newline at end of file
+}
+// Jobs assíncronos: GET ?job_id=<id> consulta o andamento e GET ?job_id=<id>&download=1
+// baixa o PDF quando o job termina.
+export async function GET(req: NextRequest) {
+    const supabase = createServerClient();
+    const { data: { user } } = await supabase.auth.getUser();
+
+    if (!user) {
+        console.error('API Route /api/generate-pdf: Tentativa de acesso não autorizado.');
+        return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+    }
+
+    const jobId = req.nextUrl.searchParams.get('job_id');
+    if (!jobId) {
+        return NextResponse.json({ error: 'job_id é obrigatório' }, { status: 400 });
+    }
+
+    try {
+        const pythonServiceUrl = new URL(process.env.PYTHON_PDF_SERVICE_URL || 'http://127.0.0.1:5000/generate-report-pdf');
+        pythonServiceUrl.searchParams.set('job_id', jobId);
+        if (req.nextUrl.searchParams.get('download')) {
+            pythonServiceUrl.searchParams.set('download', '1');
+        }
+
+        const pythonResponse = await fetch(pythonServiceUrl);
+        const headers = new Headers(pythonResponse.headers);
+        headers.delete('Content-Encoding');
+        headers.delete('Transfer-Encoding');
+
+        return new NextResponse(pythonResponse.body, {
+            status: pythonResponse.status,
+            headers: headers,
+        });
+    } catch (error: any) {
+        console.error('API Route /api/generate-pdf: Erro ao consultar job no serviço Python:', error);
+        return NextResponse.json({ error: `Internal server error: ${error.message}` }, { status: 500 });
+    }
+}
@@ -0,0 +1,120 @@
+# src/app/api/python_pdf_generator/autosize.py
+"""Largura automática das colunas das tabelas, a partir do conteúdo.
+
+Dividir a página igualmente entre as colunas desperdiça espaço nas colunas
+curtas ("Presenças", "Presente?") e faz "Nome"/"Email" quebrarem em várias
+linhas: linhas mais altas, mais páginas e mais Paragraphs para diagramar. Aqui
+as larguras seguem o conteúdo, como no layout automático de tabelas do HTML:
+
+- largura mínima de uma coluna: a maior palavra dela (cabeçalho incluído), para
+  que nenhuma palavra precise ser partida;
+- largura natural: o maior texto da coluna numa linha só;
+- se as larguras naturais cabem, cada coluna recebe a sua e a sobra é dividida
+  na proporção delas; se não cabem, cada coluna recebe a mínima mais uma parte
+  do espaço restante proporcional ao que ainda falta para ela não quebrar.
+
+O cabeçalho (que pode quebrar em duas linhas sem custo para as demais) só entra
+na largura natural quando há espaço para isso.
+
+As larguras dos textos vêm de tabelas de largura por caractere mantidas em cache
+por fonte (text_width), mais baratas que pdfmetrics.stringWidth. Em tabelas
+grandes só uma amostra das linhas é medida (AUTOSIZE_SAMPLE_ROWS): espalhada
+pela tabela quando ela chega inteira (sample_rows), as primeiras linhas quando
+ela é lida aos poucos (ingestão em streaming).
+"""
+import os
+
+from reportlab.pdfbase.pdfmetrics import getFont
+
+# Quantas linhas de uma tabela são medidas
+AUTOSIZE_SAMPLE_ROWS = int(os.environ.get('PDF_AUTOSIZE_SAMPLE_ROWS', '500'))
+
+_width_tables = {}
+
+
+class _WidthTable(dict):
+    """Largura (em milésimos do tamanho da fonte) de cada caractere já visto."""
+
+    def __init__(self, font):
+        super().__init__()
+        self._font = font
+
+    def __missing__(self, char):
+        width = self[char] = self._font.stringWidth(char, 1000)
+        return width
+
+
+def text_width(text, font_name, font_size):
+    """Largura de `text` numa linha, equivalente a pdfmetrics.stringWidth."""
+    table = _width_tables.get(font_name)
+    if table is None:
+        table = _width_tables[font_name] = _WidthTable(getFont(font_name))
+    return sum(map(table.__getitem__, text)) * font_size / 1000
+
+
+def _measure(text, font_name, font_size):
+    """(maior palavra, maior linha) de um texto."""
+    if not text:
+        return 0, 0
+    longest_line = max(text_width(line, font_name, font_size) for line in text.split('\n'))
+    longest_word = max((text_width(word, font_name, font_size) for word in text.split()), default=0)
+    return longest_word, longest_line
+
+
+def sample_rows(rows, size=None):
+    """Até `size` linhas de uma lista (ou tabela colunar), espalhadas por ela toda."""
+    size = size or AUTOSIZE_SAMPLE_ROWS
+    if len(rows) <= size:
+        return rows
+    step = len(rows) / size
+    return [rows[int(i * step)] for i in range(size)]
+
+
+def _scale(widths, total):
+    weight = sum(widths)
+    if weight <= 0:
+        return [total / len(widths)] * len(widths)
+    return [w * total / weight for w in widths]
+
+
+def _distribute(minimums, naturals, total):
+    if sum(naturals) <= total:
+        return _scale(naturals, total)
+    if sum(minimums) >= total:
+        return _scale(minimums, total)
+    room = total - sum(minimums)
+    missing = [n - m for m, n in zip(minimums, naturals)]
+    missing_total = sum(missing)
+    return [m + room * gap / missing_total for m, gap in zip(minimums, missing)]
+
+
+def autosize_columns(header, rows, total_width, body_style, header_style, padding):
+    """Larguras das colunas (somando `total_width`) para o cabeçalho e as linhas de texto.
+
+    `rows` são as linhas (ou uma amostra delas) já formatadas como texto;
+    `padding` é o espaço horizontal das células que não recebe texto.
+    """
+    num_cols = len(header)
+    minimums = [0.0] * num_cols
+    naturals = [0.0] * num_cols
+    for row in rows:
+        for col, text in enumerate(row[:num_cols]):
+            word, line = _measure(text, body_style.fontName, body_style.fontSize)
+            if word > minimums[col]:
+                minimums[col] = word
+            if line > naturals[col]:
+                naturals[col] = line
+
+    header_naturals = list(naturals)
+    for col, text in enumerate(header):
+        word, line = _measure(text, header_style.fontName, header_style.fontSize)
+        minimums[col] = max(minimums[col], word)
+        naturals[col] = max(naturals[col], minimums[col])
+        header_naturals[col] = max(naturals[col], line)
+
+    minimums = [w + padding for w in minimums]
+    naturals = [w + padding for w in naturals]
+    header_naturals = [w + padding for w in header_naturals]
+    if sum(header_naturals) <= total_width:
+        return _scale(header_naturals, total_width)
+    return _distribute(minimums, naturals, total_width)
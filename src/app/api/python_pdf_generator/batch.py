@@ -0,0 +1,228 @@
+# src/app/api/python_pdf_generator/batch.py
+"""Renderização em lote: vários relatórios numa única chamada.
+
+Os relatórios são renderizados em paralelo num pool de processos reaproveitado
+entre chamadas (e compartilhado com o modo paralelo, ver parallel.py). O pool
+tem sempre MAX_BATCH_WORKERS processos; o número de workers pedido limita só
+quantos jobs da chamada rodam ao mesmo tempo (submit_limited). Cada processo do
+pool já importa o ReportLab, registra as fontes e monta os estilos ao ser
+criado (_warm_worker), então um relatório pequeno não paga esse custo. O resultado é um ZIP com um PDF por relatório ou um único PDF
+com um marcador (bookmark) por relatório. Um payload inválido não derruba o lote:
+cada job tem sua própria entrada no relatório de erros.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+BATCH_OUTPUTS = ('zip', 'pdf')
+MAX_BATCH_WORKERS = int(os.environ.get('PDF_BATCH_MAX_WORKERS', os.cpu_count() or 1))
+DEFAULT_BATCH_WORKERS = min(int(os.environ.get('PDF_BATCH_WORKERS', MAX_BATCH_WORKERS)), MAX_BATCH_WORKERS)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _warm_worker():
+    """Inicializador dos processos do pool: deixa fontes e estilos prontos."""
+    from . import generator
+    from .styles import available_themes, get_style_registry
+    for theme in available_themes():
+        get_style_registry(theme, generator.DEFAULT_FONT_NORMAL, generator.DEFAULT_FONT_BOLD)
+
+
+def _pool_context():
+    """Contexto de multiprocessing do pool.
+
+    Com o pool compartilhado, outra requisição pode estar renderizando numa
+    thread quando o pool cria um processo; um fork nesse momento copiaria locks
+    travados (imports, ReportLab) e o processo novo ficaria parado para sempre.
+    Com o forkserver os processos saem de um servidor sem threads, que já
+    importou o gerador (fontes e estilos continuam vindo do _warm_worker).
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return None
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([f'{__package__}.generator'])
+    return context
+
+
+def get_pool():
+    """Retorna o pool de processos do módulo, criando-o na primeira chamada.
+
+    O pool é compartilhado entre requisições: nenhuma delas o recria ou encerra
+    (o que cancelaria os jobs das outras), exceto quando ele quebra.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_BATCH_WORKERS, initializer=_warm_worker,
+                                        mp_context=_pool_context())
+        return _pool
+
+
+def _discard_pool(pool):
+    """Descarta um pool quebrado (BrokenProcessPool); o próximo get_pool cria outro."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    # Os jobs de um pool quebrado já falharam: não há o que cancelar
+    pool.shutdown(wait=False)
+
+
+def submit_limited(pool, fn, jobs, limit):
+    """Submete fn(*args) para cada args de `jobs` com no máximo `limit` rodando ao mesmo tempo.
+
+    Retorna as futures na ordem de `jobs`. Bloqueia quem chama até o último job
+    ser submetido.
+    """
+    slots = threading.Semaphore(max(1, limit))
+    futures = []
+    for args in jobs:
+        slots.acquire()
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+    return futures
+
+
+def validate_job(payload):
+    """Retorna (report_type, title, content, theme, compact) ou levanta ValueError."""
+    from .route import compact_level, normalize_report_type
+    if not isinstance(payload, dict):
+        raise ValueError("Cada item do lote deve ser um objeto JSON")
+    report_type = normalize_report_type(payload.get('type'))
+    report_title = payload.get('title')
+    report_content = payload.get('content')
+    if not report_type or not report_title or not report_content:
+        raise ValueError("Faltando report_type, title ou content")
+    return report_type, report_title, report_content, payload.get('theme'), compact_level(payload.get('compact'))
+
+
+def render_job(report_type, report_title, report_content, theme, compact=None):
+    """Executado no processo do pool."""
+    from .route import render_pdf_bytes
+    return render_pdf_bytes(report_type, report_title, report_content, theme, compact)
+
+
+def _unique_name(name, used):
+    base, ext = os.path.splitext(name or 'relatorio.pdf')
+    ext = ext or '.pdf'
+    candidate, n = f"{base}{ext}", 1
+    while candidate in used:
+        n += 1
+        candidate = f"{base}_{n}{ext}"
+    used.add(candidate)
+    return candidate
+
+
+def render_batch(payloads, workers=None, cache=None):
+    """Renderiza todos os payloads e retorna (resultados, relatório).
+
+    `resultados` é uma lista, na ordem dos payloads, de (título, nome_arquivo,
+    bytes) para os jobs bem-sucedidos ou None para os que falharam. `relatório`
+    tem uma entrada por job com índice, status e erro (se houver).
+    """
+    from .cache import make_cache_key
+
+    workers = max(1, min(int(workers or DEFAULT_BATCH_WORKERS), MAX_BATCH_WORKERS))
+    results = [None] * len(payloads)
+    report = [{'index': i, 'ok': False, 'error': None} for i in range(len(payloads))]
+    used_names = set()
+    pending = {}
+
+    for i, payload in enumerate(payloads):
+        try:
+            job = validate_job(payload)
+        except ValueError as e:
+            report[i]['error'] = str(e)
+            continue
+        name = _unique_name(payload.get('filename') or f"relatorio_{i + 1}.pdf", used_names)
+        report[i]['filename'] = name
+        key = make_cache_key(*job) if cache is not None else None
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            results[i] = (job[1], name, cached)
+            report[i]['ok'] = True
+            continue
+        pending[i] = (job, name, key)
+
+    if len(pending) <= 1 or workers == 1:
+        # Não compensa despachar para o pool
+        for i, (job, name, key) in pending.items():
+            try:
+                data = render_job(*job)
+            except Exception as e:
+                report[i]['error'] = str(e)
+                continue
+            results[i] = (job[1], name, data)
+            report[i]['ok'] = True
+            if key:
+                cache.put(key, data)
+        return results, report
+
+    pool = get_pool()
+    try:
+        futures = dict(zip(pending, submit_limited(pool, render_job,
+                                                   (job for job, _, _ in pending.values()), workers)))
+    except BrokenProcessPool as e:
+        _discard_pool(pool)
+        for i in pending:
+            report[i]['error'] = f"Processo de renderização interrompido: {e}"
+        return results, report
+    for i, future in futures.items():
+        job, name, key = pending[i]
+        try:
+            data = future.result()
+        except BrokenProcessPool as e:
+            _discard_pool(pool)
+            report[i]['error'] = f"Processo de renderização interrompido: {e}"
+            continue
+        except Exception as e:
+            report[i]['error'] = str(e)
+            continue
+        results[i] = (job[1], name, data)
+        report[i]['ok'] = True
+        if key:
+            cache.put(key, data)
+    return results, report
+
+
+def build_zip(results, report):
+    """ZIP com um PDF por relatório e o relatório do lote (relatorio_lote.json)."""
+    buffer = BytesIO()
+    # Os PDFs já são comprimidos internamente: armazenar sem compressão é mais rápido
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for result in results:
+            if result is not None:
+                _, name, data = result
+                zf.writestr(name, data)
+        zf.writestr('relatorio_lote.json', json.dumps(report, ensure_ascii=False, indent=2),
+                    compress_type=zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+
+def build_merged_pdf(results):
+    """Um único PDF com todos os relatórios, com um marcador (bookmark) para cada um."""
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError as e:
+        raise RuntimeError("A saída em PDF único requer o pacote 'pypdf'") from e
+
+    writer = PdfWriter()
+    for result in results:
+        if result is not None:
+            title, _, data = result
+            writer.append(PdfReader(BytesIO(data)), outline_item=title)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
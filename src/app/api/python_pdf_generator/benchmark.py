@@ -0,0 +1,348 @@
+# src/app/api/python_pdf_generator/benchmark.py
+"""Benchmark do gerador de PDFs.
+
+Monta payloads sintéticos para cada tipo de relatório tratado em POST, chama o
+handler por um cliente de teste do Werkzeug (o mesmo caminho de uma requisição
+real) e registra tempo, pico de memória (RSS), número de páginas e tamanho do
+arquivo. Cada caso roda num processo separado, para que o pico de memória de um
+caso não contamine o próximo.
+
+Uso (a partir de src/app/api):
+
+    python -m python_pdf_generator.benchmark --output baseline.json
+    python -m python_pdf_generator.benchmark --compare baseline.json --threshold 0.15
+    python -m python_pdf_generator.benchmark --reports faltosos --sizes 10,1000,100000
+    python -m python_pdf_generator.benchmark --modes normal,compact --sizes 10,1000
+
+Com --modes cada caso roda em cada modo de saída (ver MODES) e, ao final, uma
+tabela compara os bytes por página de cada tipo de relatório entre os modos.
+
+No modo --compare os mesmos casos do baseline são executados de novo e o comando
+termina com código 1 se alguma métrica piorar mais que o limite.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+# Métricas comparadas no modo --compare (todas: quanto menor, melhor)
+COMPARED_METRICS = ('wall_ms', 'peak_rss_kb', 'bytes', 'coldstart_ms')
+COLDSTART_RE = re.compile(r'coldstart;dur=([0-9.]+)')
+
+# Modos de saída: opções acrescentadas ao payload de cada caso
+MODES = {
+    'normal': {'compact': False},
+    'compact': {'compact': True},
+}
+
+_FIRST_NAMES = ('Ana', 'João', 'Maria', 'José', 'Francisco', 'Antônia', 'Carlos', 'Paulo',
+                'Luíza', 'Pedro', 'Lucas', 'Juliana', 'Márcia', 'Raimundo', 'Sebastião')
+_LAST_NAMES = ('Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves',
+               'Pereira', 'Lima', 'Gomes', 'Conceição', 'Araújo', 'Nascimento de Jesus')
+_THEMES = ('Fé e obras', 'O fruto do Espírito', 'Perdão', 'Família', 'Servir com alegria')
+_CELLS = ('Célula Esperança', 'Célula Vida Nova', 'Célula Betel', 'Célula Shalom')
+
+PAGE_RE = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+
+
+# --- Payloads sintéticos ---
+
+def _name(rng):
+    return f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)} {rng.choice(_LAST_NAMES)}"
+
+
+def _phone(rng):
+    return f"{rng.randint(11, 99)}9{rng.randint(10000000, 99999999)}"
+
+
+def _date(rng, year=2024):
+    # Poucas datas distintas, como num histórico real de reuniões semanais
+    return f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def _email(i):
+    return f"usuario{i}@exemplo.com.br"
+
+
+def build_payload(report_type, rows, seed=0):
+    """Payload sintético de `report_type` com `rows` linhas em cada tabela."""
+    rng = random.Random(seed)
+    people = lambda: [{'nome': _name(rng), 'telefone': _phone(rng)} for _ in range(rows)]
+
+    if report_type == 'presenca_reuniao':
+        content = {'reuniao_detalhes': {'data_reuniao': '2024-05-12', 'tema': rng.choice(_THEMES),
+                                        'ministrador_principal_nome': _name(rng),
+                                        'ministrador_secundario_nome': _name(rng),
+                                        'responsavel_kids_nome': _name(rng), 'num_criancas': 7},
+                   'membros_presentes': people(), 'membros_ausentes': people(),
+                   'visitantes_presentes': people()}
+    elif report_type == 'presenca_membro':
+        content = {'membro_data': {'nome': _name(rng), 'telefone': _phone(rng),
+                                   'data_ingresso': '2019-03-10', 'data_nascimento': '1988-07-21'},
+                   'historico_presenca': [{'data_reuniao': _date(rng), 'tema': rng.choice(_THEMES),
+                                           'presente': rng.random() < 0.7} for _ in range(rows)]}
+    elif report_type == 'faltosos':
+        content = {'start_date': '2024-01-01', 'end_date': '2024-06-30',
+                   'faltosos': [{'nome': _name(rng), 'telefone': _phone(rng),
+                                 'total_presencas': rng.randint(0, 10), 'total_reunioes_no_periodo': 26}
+                                for _ in range(rows)]}
+    elif report_type == 'visitantes_periodo':
+        content = {'start_date': '2024-01-01', 'end_date': '2024-06-30',
+                   'visitantes': [{'nome': _name(rng), 'telefone': _phone(rng),
+                                   'data_primeira_visita': _date(rng)} for _ in range(rows)]}
+    elif report_type == 'aniversariantes_mes':
+        birthday = lambda: {'nome': _name(rng), 'data_nascimento': _date(rng, rng.randint(1950, 2015)),
+                            'telefone': _phone(rng), 'celula_nome': rng.choice(_CELLS)}
+        content = {'membros': [birthday() for _ in range(rows)],
+                   'visitantes': [birthday() for _ in range(rows)]}
+    elif report_type == 'alocacao_lideres':
+        content = {'lideres_alocados': [{'email': _email(i), 'role': 'líder',
+                                         'celula_nome': rng.choice(_CELLS),
+                                         'ultimo_login': f"{_date(rng)}T18:30:00Z"} for i in range(rows)],
+                   'lideres_nao_alocados': [{'email': _email(i), 'role': 'líder',
+                                             'data_criacao_perfil': _date(rng, 2023),
+                                             'ultimo_login': None} for i in range(rows)],
+                   'celulas_sem_lider_atribuido': [{'nome': rng.choice(_CELLS),
+                                                    'lider_principal_cadastrado_na_celula': _name(rng)}
+                                                   for _ in range(rows)],
+                   'total_perfis_lider': rows * 2, 'total_celulas': rows}
+    elif report_type == 'chaves_ativacao':
+        content = {'chaves_ativas': [{'chave': f"{rng.getrandbits(64):016x}", 'celula_nome': rng.choice(_CELLS)}
+                                     for _ in range(rows)],
+                   'chaves_usadas': [{'chave': f"{rng.getrandbits(64):016x}", 'celula_nome': rng.choice(_CELLS),
+                                      'usada_por_email': _email(i), 'data_uso': _date(rng)}
+                                     for i in range(rows)],
+                   'total_chaves': rows * 2}
+    else:
+        raise ValueError(f"Tipo de relatório desconhecido: {report_type}")
+
+    return {'type': report_type, 'title': f"Benchmark {report_type} ({rows} linhas)",
+            'content': content, 'filename': f"{report_type}.pdf"}
+
+
+REPORT_TYPES = ('presenca_reuniao', 'presenca_membro', 'faltosos', 'visitantes_periodo',
+                'aniversariantes_mes', 'alocacao_lideres', 'chaves_ativacao')
+
+
+# --- Execução ---
+
+def _wsgi_app():
+    from werkzeug.wrappers import Request
+    from . import route
+
+    def app(environ, start_response):
+        return route.POST(Request(environ))(environ, start_response)
+    return app
+
+
+def _run_case(report_type, rows, options, queue):
+    """Executado num processo filho: roda um caso e devolve as métricas pela fila."""
+    try:
+        from werkzeug.test import Client
+        client = Client(_wsgi_app())
+        payload = build_payload(report_type, rows)
+        payload.update(options)
+        body = json.dumps(payload)
+        del payload
+
+        start = time.perf_counter()
+        response = client.post('/', data=body, content_type='application/json')
+        data = response.get_data()
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        if response.status_code != 200:
+            queue.put({'error': f"HTTP {response.status_code}: {data[:200]!r}"})
+            return
+        pages = len(PAGE_RE.findall(data))
+        # Cada caso roda num processo que ainda não importou o serviço: a primeira
+        # requisição informa o tempo da importação até o primeiro byte.
+        coldstart = COLDSTART_RE.search(response.headers.get('Server-Timing', ''))
+        queue.put({'wall_ms': round(wall_ms, 1),
+                   'coldstart_ms': float(coldstart.group(1)) if coldstart else None,
+                   'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   'pages': pages,
+                   'bytes': len(data),
+                   'bytes_per_page': round(len(data) / pages) if pages else None,
+                   'payload_bytes': len(body)})
+    except Exception as e:
+        queue.put({'error': repr(e)})
+
+
+def run_case(report_type, rows, repeat=1, options=None):
+    """Roda o caso `repeat` vezes (cada uma num processo novo) e fica com a menor medida."""
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+    best = None
+    for _ in range(repeat):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_case, args=(report_type, rows, options or {}, queue))
+        proc.start()
+        result = queue.get()
+        proc.join()
+        if 'error' in result:
+            return result
+        if best is None:
+            best = result
+        else:
+            for metric in ('wall_ms', 'peak_rss_kb', 'coldstart_ms'):
+                if result[metric] is not None:
+                    best[metric] = min(best[metric], result[metric]) if best[metric] is not None else result[metric]
+    return best
+
+
+def run_suite(report_types, sizes, repeat=1, options=None, modes=('normal',), log=print):
+    results = []
+    for report_type in report_types:
+        for rows in sizes:
+            for mode in modes:
+                case_options = dict(MODES[mode], **(options or {}))
+                metrics = run_case(report_type, rows, repeat=repeat, options=case_options)
+                entry = {'report': report_type, 'rows': rows, 'mode': mode}
+                entry.update(metrics)
+                results.append(entry)
+                if 'error' in metrics:
+                    log(f"{report_type:>20} {rows:>7} linhas {mode:>8}  ERRO: {metrics['error']}")
+                else:
+                    log(f"{report_type:>20} {rows:>7} linhas {mode:>8}  {metrics['wall_ms']:>10.1f} ms  "
+                        f"{metrics['peak_rss_kb'] / 1024:>8.1f} MB  {metrics['pages']:>6} pág  "
+                        f"{metrics['bytes'] / 1024:>10.1f} KB  {metrics['bytes_per_page'] or 0:>7} B/pág  "
+                        f"cold start {metrics['coldstart_ms'] or 0:>7.1f} ms")
+    return results
+
+
+def bytes_per_page_summary(results):
+    """Bytes por página de cada tipo de relatório em cada modo (soma dos bytes / soma das páginas)."""
+    totals = {}
+    for entry in results:
+        if 'error' in entry or not entry.get('pages'):
+            continue
+        report = totals.setdefault(entry['report'], {})
+        data, pages = report.get(entry['mode'], (0, 0))
+        report[entry['mode']] = (data + entry['bytes'], pages + entry['pages'])
+    return {report: {mode: round(data / pages) for mode, (data, pages) in by_mode.items()}
+            for report, by_mode in totals.items()}
+
+
+def print_bytes_per_page(summary, modes, log=print):
+    log("\nBytes por página:")
+    log(f"{'relatório':>20} " + ' '.join(f"{mode:>10}" for mode in modes)
+        + (f" {'variação':>10}" if len(modes) > 1 else ''))
+    for report, by_mode in summary.items():
+        line = f"{report:>20} " + ' '.join(f"{by_mode.get(mode, 0):>10}" for mode in modes)
+        first, last = by_mode.get(modes[0]), by_mode.get(modes[-1])
+        if len(modes) > 1 and first and last:
+            line += f" {(last - first) / first:>+10.1%}"
+        log(line)
+
+
+def _metadata():
+    try:
+        import reportlab
+        reportlab_version = reportlab.Version
+    except ImportError:
+        reportlab_version = None
+    return {'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'reportlab': reportlab_version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()}
+
+
+def _case_key(entry):
+    # Baselines anteriores ao --modes só têm o modo normal
+    return (entry['report'], entry['rows'], entry.get('mode', 'normal'))
+
+
+def compare(baseline, current, threshold):
+    """Lista as regressões: métricas que pioraram mais que `threshold` (fração)."""
+    previous = {_case_key(e): e for e in baseline['results'] if 'error' not in e}
+    regressions = []
+    for entry in current['results']:
+        old = previous.get(_case_key(entry))
+        if old is None or 'error' in entry:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = old.get(metric), entry.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if change > threshold:
+                regressions.append({'report': entry['report'], 'rows': entry['rows'],
+                                    'mode': entry.get('mode', 'normal'), 'metric': metric,
+                                    'baseline': before, 'current': after,
+                                    'change_pct': round(change * 100, 1)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do gerador de PDFs")
+    parser.add_argument('--reports', default=','.join(REPORT_TYPES),
+                        help="tipos de relatório separados por vírgula")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="quantidades de linhas por tabela, separadas por vírgula")
+    parser.add_argument('--modes', default='normal',
+                        help=f"modos de saída separados por vírgula ({', '.join(MODES)})")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="execuções por caso (fica com o menor tempo)")
+    parser.add_argument('--output', help="arquivo JSON onde salvar os resultados")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="compara com um baseline salvo (roda os mesmos casos dele)")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="piora máxima aceita no --compare (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    # O benchmark mede a renderização: o cache de PDFs não pode responder por ela.
+    os.environ['PDF_CACHE_ENABLED'] = '0'
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        report_types = sorted({e['report'] for e in baseline['results']}, key=REPORT_TYPES.index)
+        sizes = sorted({e['rows'] for e in baseline['results']})
+        modes = sorted({e.get('mode', 'normal') for e in baseline['results']}, key=list(MODES).index)
+    else:
+        report_types = [r for r in args.reports.split(',') if r]
+        sizes = [int(s) for s in args.sizes.split(',') if s]
+        modes = [m for m in args.modes.split(',') if m]
+    unknown = set(report_types) - set(REPORT_TYPES)
+    if unknown:
+        parser.error(f"tipos de relatório desconhecidos: {', '.join(sorted(unknown))}")
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"modos desconhecidos: {', '.join(sorted(unknown))}")
+
+    # Os metadados importam o ReportLab: só depois dos casos, para que os processos
+    # filhos não o herdem já carregado (o que esconderia o custo do cold start).
+    results = run_suite(report_types, sizes, repeat=args.repeat, modes=modes)
+    summary = bytes_per_page_summary(results)
+    print_bytes_per_page(summary, modes)
+    current = {'meta': _metadata(), 'results': results, 'bytes_per_page': summary}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"Resultados salvos em {args.output}")
+
+    if baseline is not None:
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressão(ões) acima de {args.threshold:.0%}:")
+            for r in regressions:
+                print(f"  {r['report']} ({r['rows']} linhas, {r['mode']}) {r['metric']}: "
+                      f"{r['baseline']} -> {r['current']} (+{r['change_pct']}%)")
+            return 1
+        print(f"\nNenhuma regressão acima de {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
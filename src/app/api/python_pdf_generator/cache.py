@@ -0,0 +1,205 @@
+# src/app/api/python_pdf_generator/cache.py
+"""Cache de PDFs gerados, endereçado pelo conteúdo da requisição.
+
+A chave é o SHA-256 do payload canonicalizado (tipo, título, conteúdo e tema),
+então o mesmo relatório pedido várias vezes só é renderizado uma vez. Como o
+PDFGenerator gera saída invariante (sem data de criação nem ID aleatório),
+entradas iguais produzem exatamente os mesmos bytes e a chave serve também de
+ETag.
+
+Camadas:
+- memória: LRU limitado por número de entradas e por total de bytes;
+- disco (opcional, PDF_CACHE_DIR): sobrevive entre processos/instâncias.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Mudar sempre que a aparência dos PDFs mudar, para invalidar o cache em disco.
+CACHE_VERSION = '2'
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def make_cache_key(report_type, report_title, report_content, theme=None, compact=None, preview=None,
+                   parallel=None):
+    """SHA-256 do payload canonicalizado (chaves ordenadas, sem espaços)."""
+    payload = {'v': CACHE_VERSION,
+               'type': report_type,
+               'title': report_title,
+               'content': report_content,
+               'theme': theme}
+    if compact:
+        # Só entra na chave quando usado: as chaves dos PDFs normais não mudam
+        payload['compact'] = compact
+    if preview:
+        payload['preview'] = preview
+    if parallel:
+        # Relatórios grandes em partes saem com outra paginação (ver parallel.py)
+        payload['parallel'] = True
+    canonical = json.dumps(payload,
+                           sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class PDFCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=256, disk_dir=None,
+                 disk_max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = None  # Calculado sob demanda na primeira escrita em disco
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        """Configuração via variáveis de ambiente. PDF_CACHE_ENABLED=0 desliga o cache."""
+        if os.environ.get('PDF_CACHE_ENABLED', '1') == '0':
+            return None
+        return cls(max_bytes=_env_int('PDF_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+                   max_entries=_env_int('PDF_CACHE_MAX_ENTRIES', 256),
+                   disk_dir=os.environ.get('PDF_CACHE_DIR') or None,
+                   disk_max_bytes=_env_int('PDF_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+
+    # --- Memória ---
+
+    def get(self, key):
+        """Retorna os bytes do PDF ou None. Um acerto em disco é promovido para a memória."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._store(key, data)
+        self._write_disk(key, data)
+
+    def _store(self, key, data):
+        if len(data) > self.max_bytes:
+            return  # Maior que o cache inteiro: não vale a pena guardar
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    # --- Disco ---
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.pdf")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Escrita atômica: outro processo nunca lê um arquivo pela metade
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"AVISO: Não foi possível gravar o PDF no cache em disco: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _disk_files(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith('.pdf'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _evict_disk(self):
+        # Remove os arquivos mais antigos até voltar a 90% do limite
+        target = self.disk_max_bytes * 0.9
+        files = sorted(self._disk_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.disk_evictions += 1
+        self._disk_bytes = total
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_enabled': bool(self.disk_dir),
+                'disk_bytes': self._disk_bytes,
+                'disk_evictions': self.disk_evictions,
+            }
+
+
+# Instância do processo (None se desligado via PDF_CACHE_ENABLED=0)
+pdf_cache = PDFCache.from_env()
+
+
+def get_cache_stats():
+    return pdf_cache.stats() if pdf_cache is not None else {'enabled': False}
@@ -0,0 +1,80 @@
+# src/app/api/python_pdf_generator/columnar.py
+"""Tabelas no formato colunar.
+
+No formato normal cada linha de uma tabela é um objeto que repete as chaves
+({"nome": ..., "telefone": ...}). No formato colunar a seção traz um array por
+campo, todos do mesmo tamanho:
+
+    "faltosos": {"nome": ["Ana", "Bruno"], "telefone": ["...", "..."], ...}
+
+O payload fica bem menor e mais rápido de serializar e de decodificar, e as
+colunas já chegam prontas para a formatação por coluna de format_table_rows,
+sem montar um dict por linha.
+"""
+
+
+class ColumnarRecords:
+    """Registros de uma tabela no formato colunar ({campo: [valores]}).
+
+    Funciona como uma sequência de registros (dicts) para quem percorre as
+    linhas, mas format_table_rows e iter_table_rows leem as colunas direto.
+    """
+
+    def __init__(self, columns):
+        if not isinstance(columns, dict):
+            raise ValueError("Tabela colunar deve ser um objeto com um array por campo")
+        lengths = set()
+        for key, values in columns.items():
+            if not isinstance(values, list):
+                raise ValueError(f"Tabela colunar: o campo '{key}' deve ser um array")
+            lengths.add(len(values))
+        if len(lengths) > 1:
+            raise ValueError("Tabela colunar: os arrays dos campos têm tamanhos diferentes")
+        self.columns = columns
+        self._length = lengths.pop() if lengths else 0
+
+    def __len__(self):
+        return self._length
+
+    def column(self, key):
+        """Valores de um campo (KeyError se o campo não existir, como num registro)."""
+        return self.columns[key]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ColumnarRecords({key: values[index] for key, values in self.columns.items()})
+        return {key: values[index] for key, values in self.columns.items()}
+
+    def __iter__(self):
+        return ColumnarIterator(self)
+
+
+class ColumnarIterator:
+    """Iterador de registros que também entrega blocos ainda em colunas (take)."""
+
+    def __init__(self, records):
+        self._records = records
+        self._pos = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pos >= len(self._records):
+            raise StopIteration
+        record = self._records[self._pos]
+        self._pos += 1
+        return record
+
+    def take(self, count):
+        """Os próximos `count` registros (ou menos, no fim) como ColumnarRecords."""
+        chunk = self._records[self._pos:self._pos + count]
+        self._pos += len(chunk)
+        return chunk
+
+
+def columnar_records(value):
+    """Converte uma seção no formato colunar (dict) em ColumnarRecords; outros valores passam direto."""
+    if isinstance(value, dict):
+        return ColumnarRecords(value)
+    return value
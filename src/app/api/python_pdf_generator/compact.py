@@ -0,0 +1,178 @@
+# src/app/api/python_pdf_generator/compact.py
+"""Modo compacto de saída: PDFs menores em troca de um pouco mais de CPU.
+
+No modo normal o ReportLab:
+- embute, para cada fonte, um subconjunto com todos os caracteres ASCII (mais os
+  acentuados usados) e a tabela 'name' inteira do TTF, que no DejaVu traz o
+  texto completo da licença (~14 KB por fonte, antes da compressão);
+- codifica o conteúdo das páginas em ASCII85 por cima do Flate (~25% a mais);
+- repete em cada página o mesmo dicionário de recursos.
+
+No modo compacto:
+- as fontes são variantes registradas como '<fonte>-Compact', cujo subconjunto
+  só leva os glifos de fato usados e cuja tabela 'name' vai sem o texto da
+  licença (o copyright e a URL da licença continuam);
+- as streams (conteúdo das páginas, arquivos das fontes e mapas ToUnicode) vão
+  só com Flate, no nível de zlib escolhido: é o botão de tamanho vs. CPU
+  (1 = mais rápido, 9 = menor);
+- as páginas compartilham um único dicionário de recursos.
+
+Nada disso altera a configuração global do ReportLab (rl_config): tudo é
+aplicado ao documento pelo CompactCanvas, então PDFs normais e compactos
+podem ser gerados ao mesmo tempo no mesmo processo.
+
+_compact_document mexe em atributos internos do documento e das páginas do
+ReportLab (delayedFonts, _shadingUsed, _colorsUsed), sem equivalente público:
+por isso a versão do ReportLab é fixada em requirements.txt.
+"""
+import copy
+import struct
+import threading
+import zlib
+from functools import partial
+from weakref import WeakKeyDictionary
+
+from reportlab.lib.fonts import addMapping
+from reportlab.pdfbase import pdfdoc, pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from .page_streams import PageStreamCanvas
+
+# Nível do zlib quando nenhum é informado (o padrão do serviço vem de PDF_COMPACT_LEVEL, em route.py)
+DEFAULT_LEVEL = 6
+COMPACT_FONT_SUFFIX = '-Compact'
+
+# Registros da tabela 'name' que não vão para o subconjunto (13 = texto da licença)
+DROPPED_NAME_IDS = frozenset({13})
+
+_compact_fonts = {}
+_lock = threading.Lock()
+
+
+class ZCompress(pdfdoc.PDFStreamFilterZCompress):
+    """Filtro Flate com nível de compressão configurável."""
+
+    def __init__(self, level=DEFAULT_LEVEL):
+        self.level = level
+
+    def encode(self, text):
+        if isinstance(text, str):
+            text = text.encode('utf8')
+        return zlib.compress(text, self.level)
+
+
+def _strip_name_table(data):
+    """Tabela 'name' (formato 0) sem os registros de DROPPED_NAME_IDS."""
+    name_format, count, offset = struct.unpack_from('>3H', data)
+    if name_format != 0:
+        return data
+    records, strings, positions = [], b'', {}
+    for i in range(count):
+        platform, encoding, language, name_id, length, start = struct.unpack_from('>6H', data, 6 + 12 * i)
+        if name_id in DROPPED_NAME_IDS:
+            continue
+        text = data[offset + start:offset + start + length]
+        if text not in positions:
+            positions[text] = len(strings)
+            strings += text
+        records.append(struct.pack('>6H', platform, encoding, language, name_id, length, positions[text]))
+    return struct.pack('>3H', 0, len(records), 6 + 12 * len(records)) + b''.join(records) + strings
+
+
+def _get_table(get_table, name_table, tag):
+    return name_table if tag == 'name' else get_table(tag)
+
+
+def _compact_font(font):
+    compact = copy.copy(font)
+    compact.fontName = font.fontName + COMPACT_FONT_SUFFIX
+    compact._asciiReadable = 0  # Só os glifos usados, sem o bloco ASCII inteiro
+    compact.state = WeakKeyDictionary()
+    face = compact.face = copy.copy(font.face)
+    # Nome PostScript próprio: com o mesmo da original, registerFont devolveria a original
+    face.name = font.face.name + COMPACT_FONT_SUFFIX.encode('ascii')
+    face.get_table = partial(_get_table, font.face.get_table, _strip_name_table(font.face.get_table('name')))
+    return compact
+
+
+def compact_fonts(font_normal, font_bold):
+    """Registra (uma vez por processo) as variantes compactas das fontes e retorna seus nomes.
+
+    Fontes que não são TrueType (o fallback Helvetica) não são embutidas e
+    ficam como estão.
+    """
+    with _lock:
+        names = []
+        for name in (font_normal, font_bold):
+            compact_name = _compact_fonts.get(name)
+            if compact_name is None:
+                font = pdfmetrics.getFont(name)
+                compact_name = name
+                if isinstance(font, TTFont):
+                    compact = _compact_font(font)
+                    pdfmetrics.registerFont(compact)
+                    compact_name = compact.fontName
+                _compact_fonts[name] = compact_name
+            names.append(compact_name)
+        compact_normal, compact_bold = names
+        # Mesmo mapeamento de negrito feito para as fontes normais em fonts.py
+        addMapping(compact_normal, 1, 0, compact_bold)
+        return compact_normal, compact_bold
+
+
+def _compact_document(doc, flate):
+
+    # Os objetos das fontes (subconjuntos e ToUnicode) normalmente só são criados
+    # dentro do GetPDFData; criados aqui, os filtros deles podem ser trocados abaixo.
+    for font in doc.delayedFonts:
+        font.addObjects(doc)
+    doc.delayedFonts = []
+
+    shared_resources = {}
+    for page in doc.Pages.pages:
+        if page.Trans is not None and not page.Trans.dict:
+            page.Trans = None
+        if page.Resources or page.XObjects or page.ExtGState or page._shadingUsed or page._colorsUsed:
+            continue
+        # Páginas só com texto e desenho usam o mesmo dicionário (as fontes já são compartilhadas)
+        has_images = bool(page.hasImages)
+        resources = shared_resources.get(has_images)
+        if resources is None:
+            dictionary = pdfdoc.PDFResourceDictionary()
+            dictionary.basicFonts()
+            if has_images:
+                dictionary.allProcs()
+            resources = shared_resources[has_images] = doc.Reference(dictionary, f'SharedResources{int(has_images)}')
+        page.Resources = resources
+
+    for obj in list(doc.idToObject.values()):
+        filters = getattr(obj, 'filters', None)
+        if filters:
+            obj.filters = [flate if f is pdfdoc.PDFZCompress else f for f in filters]
+
+
+class CompactCanvas(PageStreamCanvas):
+    """Canvas que aplica o modo compacto ao documento no momento de gravar.
+
+    O conteúdo das páginas já é comprimido no showPage (ver page_streams.py),
+    só com Flate no nível escolhido.
+    """
+
+    def __init__(self, *args, compress_level=DEFAULT_LEVEL, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compress_level = compress_level
+        self._flate = ZCompress(compress_level)
+
+    def page_filters(self):
+        return [self._flate]  # Sem ASCII85
+
+    def save(self):
+        if len(self._code):
+            self.showPage()
+        _compact_document(self._doc, self._flate)
+        super().save()
+
+
+def compact_canvasmaker(level=DEFAULT_LEVEL):
+    """canvasmaker para SimpleDocTemplate.build com o nível de compressão `level`."""
+    return partial(CompactCanvas, compress_level=level)
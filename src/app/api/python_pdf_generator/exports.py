@@ -0,0 +1,292 @@
+# src/app/api/python_pdf_generator/exports.py
+"""Exportação dos relatórios em CSV ou XLSX, sem passar pelo ReportLab.
+
+ReportExport tem a mesma interface de montagem do PDFGenerator (add_title,
+add_section_heading, add_records_table...), então o render_report monta nele as
+mesmas seções do PDF, com a mesma formatação (formatters.py). As tabelas ficam
+guardadas como iteradores e só são lidas e formatadas, em blocos, enquanto o
+arquivo é escrito na resposta em streaming: a memória usada não depende do
+número de linhas.
+
+- CSV: separador ';' e BOM UTF-8 (abre direto no Excel em pt-BR). As seções
+  vêm uma depois da outra, separadas por uma linha em branco. Células que
+  começam com =, +, -, @, tab ou CR ganham um ' na frente, para que o Excel
+  não as trate como fórmulas (os nomes vêm de formulários).
+- XLSX: uma planilha "Resumo" com o título e os textos do relatório e uma
+  planilha por tabela. O XML das planilhas é escrito direto no ZIP, linha a
+  linha (células inlineStr, sem tabela de strings compartilhadas).
+"""
+import codecs
+import csv
+import re
+import zipfile
+from io import StringIO
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from .formatters import check_records, format_nullable_data, iter_table_rows
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# formato -> (mimetype, extensão)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', '.csv'),
+    'xlsx': (XLSX_MIMETYPE, '.xlsx'),
+}
+
+CSV_DELIMITER = ';'
+# Início de célula que o Excel/LibreOffice interpretariam como fórmula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Linhas escritas entre duas entregas de pedaços da resposta
+EXPORT_ROWS_PER_CHUNK = 2048
+# Compressão rápida: o ganho de um nível maior é pequeno para o custo
+XLSX_COMPRESSLEVEL = 1
+
+
+class ReportExport:
+    """Coleta as seções do relatório com a interface de montagem do PDFGenerator.
+
+    `blocks` é uma lista de (tipo, texto) para títulos e textos e de
+    ('table', cabeçalho, linhas, texto_vazio) para tabelas.
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self.row_count = 0
+
+    def add_title(self, text):
+        self.blocks.append(('title', text))
+
+    def add_section_heading(self, text):
+        self.blocks.append(('heading', text))
+
+    def add_subsection_heading(self, text):
+        self.blocks.append(('subheading', text))
+
+    def add_paragraph(self, text):
+        self.blocks.append(('text', text))
+
+    def add_small_italic_text(self, text):
+        self.blocks.append(('note', text))
+
+    def add_spacer(self, height=None):
+        pass
+
+    def add_table(self, data, col_widths=None, large=None, empty_text=None):
+        rows = iter(data if data else ())
+        header = next(rows, None)
+        if header is None:
+            self.add_small_italic_text("Nenhum dado para exibir na tabela.")
+            return
+        body = ([format_nullable_data(cell) for cell in row] for row in rows)
+        self.blocks.append(('table', list(header), self._counted(body), empty_text))
+
+    def add_records_table(self, header, records, columns, empty_text, col_widths=None):
+        # Os cabeçalhos da resposta saem antes das linhas serem lidas: erro de chave já aqui
+        check_records(records, columns)
+        rows = iter_table_rows(records if records is not None else (), columns)
+        self.blocks.append(('table', list(header), self._counted(rows), empty_text))
+
+    def _counted(self, rows):
+        for row in rows:
+            self.row_count += 1
+            yield row
+
+
+def _chunks(rows):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, EXPORT_ROWS_PER_CHUNK))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- CSV ---
+
+def _csv_cell(value):
+    text = value if value.__class__ is str else str(value)
+    return "'" + text if text.startswith(CSV_FORMULA_PREFIXES) else text
+
+
+def _csv_row(cells):
+    return [_csv_cell(cell) for cell in cells]
+
+
+def write_csv(export, out):
+    """Escreve o CSV em `out`; gerador que cede o controle a cada bloco de linhas."""
+    buffer = StringIO()
+    writer = csv.writer(buffer, delimiter=CSV_DELIMITER, lineterminator='\r\n')
+
+    def flush():
+        out.write(buffer.getvalue().encode('utf-8'))
+        buffer.seek(0)
+        buffer.truncate()
+
+    out.write(codecs.BOM_UTF8)
+    for block in export.blocks:
+        if block[0] != 'table':
+            writer.writerow(_csv_row([block[1]]))
+            continue
+        _, header, rows, empty_text = block
+        has_rows = False
+        for chunk in _chunks(rows):
+            if not has_rows:
+                writer.writerow(_csv_row(header))
+                has_rows = True
+            writer.writerows(map(_csv_row, chunk))
+            flush()
+            yield
+        if not has_rows:
+            writer.writerow(_csv_row([empty_text or '']))
+        writer.writerow([])
+    flush()
+
+
+# --- XLSX ---
+
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def _xml_text(value):
+    text = escape(value if value.__class__ is str else str(value))
+    if _INVALID_XML_CHARS.search(text):
+        text = _INVALID_XML_CHARS.sub('', text)
+    return text
+
+
+def _row_xml(number, cells, style=0):
+    s = f' s="{style}"' if style else ''
+    return (f'<row r="{number}">'
+            + ''.join(f'<c t="inlineStr"{s}><is><t xml:space="preserve">{_xml_text(v)}</t></is></c>' for v in cells)
+            + '</row>')
+
+
+_SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+               '<sheetData>')
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+_STYLES_XML = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+               '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+               '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+               '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+               '<fill><patternFill patternType="gray125"/></fill></fills>'
+               '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+               '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+               '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+               '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+               '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+               '</styleSheet>')
+
+_ROOT_RELS_XML = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                  '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                  '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+                  '</Relationships>')
+
+_BOLD = 1  # Índice do estilo em negrito em _STYLES_XML
+
+
+def _sheet_name(text, used):
+    name = _INVALID_SHEET_CHARS.sub('', text or '').strip().strip("'")[:31].rstrip() or 'Planilha'
+    candidate, n = name, 1
+    while candidate.lower() in used:
+        n += 1
+        suffix = f" ({n})"
+        candidate = name[:31 - len(suffix)] + suffix
+    used.add(candidate.lower())
+    return candidate
+
+
+def _write_sheet(zf, index, parts_source):
+    """Escreve xl/worksheets/sheet<index>.xml a partir de blocos de XML de linhas."""
+    with zf.open(f'xl/worksheets/sheet{index}.xml', 'w', force_zip64=True) as f:
+        f.write(_SHEET_HEAD.encode('utf-8'))
+        for parts in parts_source:
+            f.write(''.join(parts).encode('utf-8'))
+            yield
+        f.write(_SHEET_TAIL.encode('utf-8'))
+
+
+def _summary_rows(export):
+    parts = []
+    number = 0
+    for block in export.blocks:
+        if block[0] == 'table':
+            continue
+        number += 1
+        parts.append(_row_xml(number, [block[1]], _BOLD if block[0] in ('title', 'heading', 'subheading') else 0))
+    yield parts
+
+
+def _table_rows(header, rows, empty_text):
+    yield [_row_xml(1, header, _BOLD)]
+    number = 1
+    for chunk in _chunks(rows):
+        parts = []
+        for row in chunk:
+            number += 1
+            parts.append(_row_xml(number, row))
+        yield parts
+    if number == 1 and empty_text:
+        yield [_row_xml(2, [empty_text])]
+
+
+def write_xlsx(export, out):
+    """Escreve o XLSX em `out`; gerador que cede o controle a cada bloco de linhas."""
+    used_names = set()
+    sheets = [_sheet_name('Resumo', used_names)]
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=XLSX_COMPRESSLEVEL) as zf:
+        yield from _write_sheet(zf, 1, _summary_rows(export))
+
+        heading = None
+        for block in export.blocks:
+            if block[0] in ('heading', 'subheading'):
+                heading = block[1]
+            if block[0] != 'table':
+                continue
+            _, header, rows, empty_text = block
+            sheets.append(_sheet_name(heading or f"Tabela {len(sheets)}", used_names))
+            yield from _write_sheet(zf, len(sheets), _table_rows(header, rows, empty_text))
+
+        zf.writestr('xl/workbook.xml',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+                    + ''.join(f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+                              for i, name in enumerate(sheets, 1))
+                    + '</sheets></workbook>')
+        zf.writestr('xl/_rels/workbook.xml.rels',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    + ''.join(f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                              for i in range(1, len(sheets) + 1))
+                    + f'<Relationship Id="rId{len(sheets) + 1}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+                    + '</Relationships>')
+        zf.writestr('xl/styles.xml', _STYLES_XML)
+        zf.writestr('_rels/.rels', _ROOT_RELS_XML)
+        zf.writestr('[Content_Types].xml',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    '<Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                    + ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                              for i in range(1, len(sheets) + 1))
+                    + '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                    '</Types>')
+    yield
+
+
+EXPORT_WRITERS = {'csv': write_csv, 'xlsx': write_xlsx}
+
+
+def export_filename(filename, export_format):
+    """Troca a extensão .pdf (ou nenhuma) pela do formato exportado."""
+    extension = EXPORT_FORMATS[export_format][1]
+    base = filename or 'relatorio'
+    if base.lower().endswith('.pdf'):
+        base = base[:-4]
+    return base if base.lower().endswith(extension) else base + extension
@@ -0,0 +1,151 @@
+# src/app/api/python_pdf_generator/fonts.py
+"""Registro das fontes DejaVu com cache das métricas já processadas.
+
+Ler os arquivos TTF com TTFont (tabelas, larguras, mapa de caracteres) custa
+dezenas de milissegundos, pagos na primeira requisição de cada instância. O
+resultado desse processamento é gravado num arquivo (pickle) gerado no build
+(script "build:fonts" do package.json, chamado pelo "build"):
+
+    python -m python_pdf_generator.fonts --build-cache   (a partir de src/app/api)
+
+Se o arquivo não existir ou tiver sido gerado para outros TTFs/outra versão do
+ReportLab, as fontes são lidas dos TTFs como antes. Em execução o cache só é
+gravado se PDF_FONT_CACHE apontar para um caminho (gravável) escolhido por quem
+opera o serviço; o diretório do pacote nunca é alterado pelas requisições.
+"""
+import argparse
+import operator
+import os
+import pickle
+import threading
+from functools import partial
+from weakref import WeakKeyDictionary
+
+FONT_FOLDER = os.path.join(os.path.dirname(__file__), 'fonts')
+DEFAULT_FONT_NORMAL = 'DejaVuSans'
+DEFAULT_FONT_BOLD = 'DejaVuSans-Bold'
+FONT_FILES = {
+    DEFAULT_FONT_NORMAL: 'DejaVuSans.ttf',
+    DEFAULT_FONT_BOLD: 'DejaVuSans-Bold.ttf',
+}
+FALLBACK_FONT_NORMAL = 'Helvetica'
+FALLBACK_FONT_BOLD = 'Helvetica-Bold'
+
+# Com PDF_FONT_CACHE definido, um cache ausente ou desatualizado é regravado em execução
+FONT_CACHE_WRITABLE = bool(os.environ.get('PDF_FONT_CACHE'))
+FONT_CACHE_PATH = os.environ.get('PDF_FONT_CACHE') or os.path.join(FONT_FOLDER, 'fonts.cache')
+# Mudar se o formato do cache mudar
+FONT_CACHE_VERSION = '1'
+
+_registered = None
+_lock = threading.Lock()
+
+
+def _fingerprint():
+    from reportlab import Version
+    sizes = tuple((name, os.path.getsize(os.path.join(FONT_FOLDER, filename)))
+                  for name, filename in sorted(FONT_FILES.items()))
+    return (FONT_CACHE_VERSION, Version, sizes)
+
+
+def _parse_fonts():
+    from reportlab.pdfbase.ttfonts import TTFont
+    fonts = {}
+    for name, filename in FONT_FILES.items():
+        font = TTFont(name, os.path.join(FONT_FOLDER, filename))
+        # A escala de unidades é uma lambda (não serializável): troca por uma equivalente
+        units = font.face.unitsPerEm
+        font.face._pdfScale = operator.pos if units == 1000 else partial(operator.mul, 1000 / units)
+        fonts[name] = font
+    return fonts
+
+
+def _dump(fonts):
+    # O estado por documento (WeakKeyDictionary) é recriado ao carregar
+    return {name: {k: v for k, v in vars(font).items() if k != 'state'} for name, font in fonts.items()}
+
+
+def _load(data):
+    from reportlab.pdfbase.ttfonts import TTFont
+    fonts = {}
+    for name, attrs in data.items():
+        font = TTFont.__new__(TTFont)
+        font.__dict__.update(attrs)
+        font.state = WeakKeyDictionary()
+        fonts[name] = font
+    return fonts
+
+
+def build_cache(path=FONT_CACHE_PATH, fonts=None):
+    """Processa os TTFs (ou usa `fonts`) e grava o cache; retorna o caminho."""
+    fonts = fonts or _parse_fonts()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump((_fingerprint(), _dump(fonts)), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _load_cache(path=FONT_CACHE_PATH):
+    try:
+        with open(path, 'rb') as f:
+            fingerprint, data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"AVISO: Cache de fontes ilegível ({path}): {e}")
+        return None
+    if fingerprint != _fingerprint():
+        return None
+    return _load(data)
+
+
+def register_fonts():
+    """Registra as fontes (uma vez por processo) e retorna (fonte_normal, fonte_negrito)."""
+    global _registered
+    with _lock:
+        if _registered is not None:
+            return _registered
+        try:
+            from reportlab.lib.fonts import addMapping
+            from reportlab.pdfbase import pdfmetrics
+
+            fonts = _load_cache()
+            if fonts is None:
+                fonts = _parse_fonts()
+                if FONT_CACHE_WRITABLE:
+                    try:
+                        build_cache(fonts=fonts)
+                    except OSError as e:
+                        print(f"AVISO: Não foi possível gravar o cache de fontes ({FONT_CACHE_PATH}): {e}")
+            for font in fonts.values():
+                pdfmetrics.registerFont(font)
+
+            # Mapeamento para que ReportLab use suas fontes para estilos "normal" e "bold"
+            addMapping('Helvetica', 0, 0, DEFAULT_FONT_NORMAL) # Mapeia Helvetica padrão para DejaVu Sans normal
+            addMapping('Helvetica', 1, 0, DEFAULT_FONT_BOLD)   # Mapeia Helvetica Bold para DejaVu Sans bold
+            # Também mapear os nomes diretos para segurança
+            addMapping(DEFAULT_FONT_NORMAL, 0, 0, DEFAULT_FONT_NORMAL)
+            addMapping(DEFAULT_FONT_NORMAL, 1, 0, DEFAULT_FONT_BOLD)
+            _registered = (DEFAULT_FONT_NORMAL, DEFAULT_FONT_BOLD)
+        except Exception as e:
+            print(f"AVISO: Não foi possível registrar as fontes personalizadas. Usando Helvetica. Erro: {e}")
+            _registered = (FALLBACK_FONT_NORMAL, FALLBACK_FONT_BOLD)
+        return _registered
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cache das métricas das fontes do gerador de PDFs.")
+    parser.add_argument('--build-cache', action='store_true', help="processa os TTFs e grava o cache")
+    parser.add_argument('--output', default=FONT_CACHE_PATH, help="caminho do cache")
+    args = parser.parse_args(argv)
+    if not args.build_cache:
+        parser.print_help()
+        return 1
+    path = build_cache(args.output)
+    print(f"Cache de fontes gravado em {path} ({os.path.getsize(path)} bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
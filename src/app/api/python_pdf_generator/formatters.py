@@ -1,5 +1,17 @@
 # src/app/api/python_pdf_generator/formatters.py
+from calendar import monthrange
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+
+from .columnar import ColumnarRecords
+
+# Quantos valores distintos cada formatador de coluna memoriza (datas e telefones
+# se repetem muito em históricos de presença e listas de faltosos).
+FORMAT_CACHE_SIZE = 4096
+
+# Registros por bloco em iter_table_rows.
+ROW_CHUNK_SIZE = 1024
 
 def format_phone_number_for_pdf(number_str):
     if not number_str: return ""
@@ -11,8 +23,27 @@ def format_phone_number_for_pdf(number_str):
         return f"({digits[0:2]}) {digits[2:6]}-{digits[6:10]}"
     return number_str
 
+def _format_iso_date_fast(date_str):
+    """Caminho rápido para 'YYYY-MM-DD' bem formado: fatia a string em vez de usar
+    strptime/strftime. Retorna None se a string não estiver exatamente nesse formato
+    (ou não for uma data válida), para que o caminho normal decida."""
+    if len(date_str) != 10 or date_str[4] != '-' or date_str[7] != '-':
+        return None
+    year, month, day = date_str[0:4], date_str[5:7], date_str[8:10]
+    if not (year.isascii() and year.isdigit() and month.isascii() and month.isdigit()
+            and day.isascii() and day.isdigit()):
+        return None
+    y, m, d = int(year), int(month), int(day)
+    if y < 1000 or not 1 <= m <= 12 or not 1 <= d <= monthrange(y, m)[1]:
+        return None
+    return f"{day}/{month}/{year}"
+
 def format_date_for_pdf(date_str):
     if not date_str: return ""
+    if isinstance(date_str, str):
+        fast = _format_iso_date_fast(date_str)
+        if fast is not None:
+            return fast
     try:
         # Assumindo formato 'YYYY-MM-DD' para entrada (padrão de campos date em HTML e DB)
         dt_obj = datetime.strptime(date_str, "%Y-%m-%d")
@@ -37,4 +68,96 @@ def format_nullable_data(data):
     # Você pode adicionar outras condições aqui se precisar tratar outros tipos de "vazio"
     # Ex: if isinstance(data, (int, float)) and data == 0: return ""
     return str(data)
-# --- FIM DA REFATORAÇÃO 1.3 ---
\ No newline at end of file
+# --- FIM DA REFATORAÇÃO 1.3 ---
+
+def format_boolean_for_pdf(value):
+    return "Sim" if value else "Não"
+
+
+# --- Formatação por coluna ---
+# Em vez de formatar célula a célula dentro de cada linha, as tabelas dos relatórios
+# formatam uma coluna inteira de uma vez. Valores string repetidos são resolvidos
+# por um cache limitado (LRU) por formatador.
+
+def _memoized(formatter):
+    cached = lru_cache(maxsize=FORMAT_CACHE_SIZE)(formatter)
+
+    def format_values(values):
+        # Só strings passam pelo cache (são hasháveis e são o caso que se repete)
+        return [cached(v) if v.__class__ is str else formatter(v) for v in values]
+    format_values.cache_info = cached.cache_info
+    format_values.cache_clear = cached.cache_clear
+    return format_values
+
+
+def _plain(formatter):
+    def format_values(values):
+        return [formatter(v) for v in values]
+    return format_values
+
+
+COLUMN_FORMATTERS = {
+    'text': _plain(format_nullable_data),
+    'date': _memoized(format_date_for_pdf),
+    'phone': _memoized(format_phone_number_for_pdf),
+    'boolean': _plain(format_boolean_for_pdf),
+}
+
+
+def format_column(values, kind='text'):
+    """Formata uma coluna inteira (lista de valores) numa única passada.
+    `kind` é um dos tipos de COLUMN_FORMATTERS ou uma função de formatação."""
+    if callable(kind):
+        return [kind(v) for v in values]
+    return COLUMN_FORMATTERS[kind](values)
+
+
+def check_records(records, columns):
+    """Levanta já o KeyError que format_table_rows levantaria se faltar uma chave de `columns`.
+
+    Para quem adia a formatação até o doc.build (ver generator.add_records_table):
+    o erro de um payload inválido aparece na montagem da story. Só listas e
+    tabelas colunares são verificadas; os outros iteráveis só podem ser lidos uma vez.
+    """
+    keys = [key for key, _ in columns]
+    if isinstance(records, ColumnarRecords):
+        for key in keys:
+            records.column(key)
+        return
+    if not isinstance(records, (list, tuple)):
+        return
+    key_set = set(keys)
+    for record in records:
+        if record.__class__ is not dict or not record.keys() >= key_set:
+            for key in keys:
+                record[key]
+
+
+def format_table_rows(records, columns):
+    """Transforma uma lista de registros (dicts) nas linhas formatadas de uma tabela.
+
+    `columns` é uma lista de pares (chave, tipo). Cada coluna é extraída e formatada
+    de uma vez (ver format_column) e as colunas são então combinadas em linhas.
+    Registros no formato colunar (ColumnarRecords) já trazem as colunas prontas.
+    """
+    if isinstance(records, ColumnarRecords):
+        formatted = [format_column(records.column(key), kind) for key, kind in columns]
+    else:
+        formatted = [format_column([record[key] for record in records], kind) for key, kind in columns]
+    return [list(row) for row in zip(*formatted)]
+
+
+def iter_table_rows(records, columns, chunk_size=ROW_CHUNK_SIZE):
+    """Versão sob demanda de format_table_rows para iteráveis de registros.
+
+    Os registros são consumidos em blocos de `chunk_size`, formatados coluna a
+    coluna como em format_table_rows e entregues linha a linha; só um bloco fica
+    em memória por vez.
+    """
+    records = iter(records)
+    take = getattr(records, 'take', None)  # ColumnarRecords: blocos já em colunas
+    while True:
+        chunk = take(chunk_size) if take else list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield from format_table_rows(chunk, columns)
@@ -0,0 +1,345 @@
+# src/app/api/python_pdf_generator/generator.py
+"""PDFGenerator: monta a story do relatório e gera o PDF com o ReportLab.
+
+Fica fora de route.py para que o ReportLab, as fontes e os estilos só sejam
+carregados quando um PDF vai de fato ser gerado (ver route.load_pdf_generator):
+respostas 304, acertos de cache e exportações CSV/XLSX não pagam esse custo.
+"""
+import os
+import threading
+from functools import partial
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+from .autosize import autosize_columns, sample_rows
+from .columnar import ColumnarRecords
+from .compact import compact_canvasmaker, compact_fonts
+from .fonts import register_fonts
+from .formatters import check_records, format_nullable_data, format_table_rows, iter_table_rows
+from .page_streams import PageStreamCanvas
+from .preview import PreviewDocTemplate, limit_records, preview_deadline
+from .story import LazyStory
+from .styles import get_style_registry
+from .tables import CELL_HORIZONTAL_PADDING, LargeTable
+
+# Fontes lidas do cache de métricas (ver fonts.py); Helvetica se falhar.
+DEFAULT_FONT_NORMAL, DEFAULT_FONT_BOLD = register_fonts()
+
+# A partir de quantas linhas de corpo add_table usa o modo de tabela grande.
+LARGE_TABLE_MIN_ROWS = int(os.environ.get('PDF_LARGE_TABLE_MIN_ROWS', '200'))
+
+# Sem larguras explícitas, as colunas seguem o conteúdo (ver autosize.py); com
+# PDF_AUTOSIZE_COLUMNS=0 a largura da página é dividida igualmente, como antes.
+AUTOSIZE_COLUMNS = os.environ.get('PDF_AUTOSIZE_COLUMNS', '1') != '0'
+
+# As tabelas viram flowables só quando a diagramação chega nelas (ver story.py);
+# com PDF_LAZY_STORY=0 a story inteira é montada antes do doc.build, como antes.
+LAZY_STORY = os.environ.get('PDF_LAZY_STORY', '1') != '0'
+
+
+class _BuildCancelled(BaseException):
+    """Interrompe o doc.build de um iter_build abandonado (não é um erro de geração)."""
+
+
+class PDFGenerator:
+    def __init__(self, buffer_obj, theme=None, compact=None, preview=None):
+        self.buffer = buffer_obj
+        # Modo compacto (ver compact.py): nível de compressão de 1 a 9, ou None
+        self.compact = compact
+        # Pré-visualização (ver preview.py): {'pages': N, 'rows': N}, ou None
+        self.preview = preview
+
+        # Estilos compartilhados pelo processo (ver styles.py): montados uma única
+        # vez por tema, em vez de a cada requisição.
+        font_normal, font_bold = DEFAULT_FONT_NORMAL, DEFAULT_FONT_BOLD
+        if compact:
+            font_normal, font_bold = compact_fonts(font_normal, font_bold)
+        self.styles = get_style_registry(theme, font_normal, font_bold)
+        self.theme = self.styles.theme
+
+        # invariant=1: sem data de criação nem ID aleatório, para que o mesmo
+        # conteúdo gere sempre os mesmos bytes (necessário para o cache/ETag).
+        doc_kwargs = dict(pagesize=A4,
+                          rightMargin=2 * cm, leftMargin=2 * cm,
+                          topMargin=2 * cm, bottomMargin=2 * cm,
+                          invariant=1)
+        if preview:
+            # A pré-visualização precisa da LazyStory para encerrar o doc.build
+            self.doc = PreviewDocTemplate(buffer_obj, max_pages=preview['pages'],
+                                          deadline=preview_deadline(),
+                                          font_name=font_normal,
+                                          text_color=self.theme.muted_text_color,
+                                          **doc_kwargs)
+            self.story = self.doc.story = LazyStory()
+        else:
+            self.doc = SimpleDocTemplate(buffer_obj, **doc_kwargs)
+            self.story = LazyStory() if LAZY_STORY else []
+        self._section = None  # Título da última seção (para os totais da pré-visualização)
+        self.build_error = None
+        self.row_count = 0  # Linhas de corpo de todas as tabelas (para instrumentação)
+        self.table_header_style = self.styles.table_header_style
+        self.table_body_style = self.styles.table_body_style
+
+
+    def add_title(self, text):
+        self.story.append(Paragraph(text, self.styles['Title']))
+        self.story.append(Spacer(1, 0.5 * cm))
+
+    def add_section_heading(self, text):
+        self._section = text
+        self.story.append(Paragraph(text, self.styles['Celula_SectionHeading']))
+        self.story.append(Spacer(1, 0.2 * cm))
+
+    def add_subsection_heading(self, text):
+        self.story.append(Paragraph(text, self.styles['Celula_SubSectionHeading']))
+        self.story.append(Spacer(1, 0.1 * cm))
+
+    def add_paragraph(self, text):
+        self.story.append(Paragraph(text, self.styles['Celula_NormalParagraph']))
+        self.story.append(Spacer(1, 0.1 * cm))
+
+    def add_spacer(self, height=0.5 * cm):
+        self.story.append(Spacer(1, height))
+
+    def add_small_italic_text(self, text):
+        self.story.append(self._small_italic_paragraph(text))
+        self.story.append(Spacer(1, 0.1 * cm))
+
+    def _small_italic_paragraph(self, text):
+        return Paragraph(f"<i>{text}</i>", self.styles['Celula_SmallItalicText'])
+
+    def _add(self, flowables):
+        """Acrescenta os flowables de um gerador; com a LazyStory, só durante o doc.build."""
+        if isinstance(self.story, LazyStory):
+            self.story.defer(flowables)
+        else:
+            self.story.extend(flowables)
+
+    def add_records_table(self, header, records, columns, empty_text, col_widths=None):
+        """Adiciona uma tabela de registros (dicts); `columns` como em format_table_rows.
+
+        Listas (ou tabelas colunares, ver columnar.py) pequenas são formatadas de
+        uma vez, mas só quando a tabela for diagramada. Listas com LARGE_TABLE_MIN_ROWS linhas ou mais e outros
+        iteráveis (os arrays da ingestão em streaming, ver ingest.py) são
+        formatados em blocos durante o doc.build. As larguras automáticas das
+        listas grandes vêm de uma amostra da lista toda (large_table_col_widths);
+        as dos iteráveis, das primeiras linhas. Nos iteráveis, `empty_text` é
+        decidido quando a tabela for diagramada. Nas listas e tabelas colunares,
+        a falta de uma chave de `columns` levanta KeyError aqui mesmo (check_records).
+
+        Na pré-visualização só as primeiras linhas entram; o total vai para o
+        rodapé (ver preview.py).
+        """
+        if self.preview:
+            records, total = limit_records(records, self.preview['rows'])
+            self.doc.totals.append(((self._section or '').rstrip(': '), total))
+        check_records(records, columns)
+        if records is None or isinstance(records, (list, tuple, ColumnarRecords)):
+            if not records:
+                self.add_small_italic_text(empty_text)
+            elif len(records) >= LARGE_TABLE_MIN_ROWS:
+                self._add(self._large_records_table_flowables(header, records, columns, col_widths))
+            else:
+                self._add(self._records_table_flowables(header, records, columns, col_widths))
+            return
+        self.add_table(chain([header], iter_table_rows(records, columns)), col_widths,
+                       large=True, empty_text=empty_text)
+
+    def _records_table_flowables(self, header, records, columns, col_widths):
+        yield from self._table_flowables([header] + format_table_rows(records, columns), col_widths)
+
+    def _large_records_table_flowables(self, header, records, columns, col_widths):
+        # Com a lista inteira à mão, as larguras saem de uma amostra dela toda, não só do começo
+        col_widths = self.large_table_col_widths(header, records, columns, col_widths)
+        yield from self._table_flowables(chain([header], iter_table_rows(records, columns)), col_widths, large=True)
+
+    def add_table(self, data, col_widths=None, large=None, empty_text=None, row_offset=0):
+        """Adiciona uma tabela cuja primeira linha de `data` é o cabeçalho.
+
+        `data` pode ser uma lista ou qualquer iterável de linhas (consumido uma
+        única vez). O modo de tabela grande (ver tables.LargeTable) é usado quando
+        `large` for True ou, se omitido, quando `data` não for uma lista ou tiver
+        pelo menos LARGE_TABLE_MIN_ROWS linhas de corpo. No modo de tabela grande,
+        `empty_text` é exibido no lugar da tabela se não houver linhas de corpo.
+
+        Sem `col_widths`, as larguras são calculadas a partir do conteúdo (no modo
+        de tabela grande, das primeiras linhas, quando a tabela for diagramada).
+
+        `row_offset` (só no modo de tabela grande) é o número de linhas que vêm
+        antes destas numa tabela renderizada em partes (ver parallel.py).
+        """
+        if large is None:
+            large = not isinstance(data, list) or len(data) - 1 >= LARGE_TABLE_MIN_ROWS
+        self._add(self._table_flowables(data, col_widths, large, empty_text, row_offset))
+
+    def _table_flowables(self, data, col_widths, large=False, empty_text=None, row_offset=0):
+        """Gera os flowables de add_table (ver lá os parâmetros)."""
+        rows = iter(data if data else ())
+        first_row = next(rows, None)
+        if first_row is None:
+            yield self._small_italic_paragraph("Nenhum dado para exibir na tabela.")
+            yield Spacer(1, 0.1 * cm)
+            return
+
+        header_texts = [format_nullable_data(cell) for cell in first_row]
+        header_row = [Paragraph(text, self.table_header_style) for text in header_texts]
+        autosize = col_widths is None and AUTOSIZE_COLUMNS
+        if not autosize:
+            col_widths = self._resolve_col_widths(len(header_row), col_widths)
+
+        if large:
+            body_rows = ([format_nullable_data(cell) for cell in row] for row in self._counted(rows))
+            if autosize:
+                col_widths = partial(self._autosize_col_widths, header_texts)
+            empty = self._small_italic_paragraph(empty_text) if empty_text else None
+            yield LargeTable(header_row, body_rows, col_widths, self.styles, empty=empty, row_offset=row_offset)
+            yield Spacer(1, 0.5 * cm)
+            return
+
+        body_texts = [[format_nullable_data(cell) for cell in row] for row in rows]
+        if autosize:
+            col_widths = self._autosize_col_widths(header_texts, sample_rows(body_texts))
+        body_rows = []
+        for row in body_texts:
+            # Texto literal, como nas células de string simples da LargeTable
+            body_rows.append([Paragraph(escape(text), self.table_body_style) for text in row])
+        self.row_count += len(body_rows)
+
+        table_data = [header_row] + body_rows
+
+        table_style = TableStyle([], parent=self.styles.table_style)
+
+        # Adiciona fundo zebrado (alternado)
+        odd_background, even_background = self.theme.table_row_backgrounds
+        for i in range(1, len(table_data)):
+            if i % 2 == 0:
+                table_style.add('BACKGROUND', (0, i), (-1, i), even_background)
+            else:
+                table_style.add('BACKGROUND', (0, i), (-1, i), odd_background)
+        
+        # Ajusta alinhamento do corpo para a esquerda, se não foi definido pelo style do Paragraph
+        # Esta linha pode ser removida se o 'table_body_style' já for suficiente
+        table_style.add('ALIGN', (0, 1), (-1, -1), 'LEFT') # Alinha o corpo à esquerda
+
+        t = Table(table_data, colWidths=col_widths)
+        t.setStyle(table_style)
+        yield t
+        yield Spacer(1, 0.5 * cm)
+
+    def large_table_col_widths(self, header, records, columns, col_widths=None):
+        """Larguras de uma tabela grande de `records` (lista ou tabela colunar).
+
+        Sem `col_widths`, são medidas até AUTOSIZE_SAMPLE_ROWS linhas espalhadas
+        pela tabela toda (sample_rows). Usado por add_records_table e pelo modo
+        paralelo, que assim dividem a tabela com as mesmas larguras.
+        """
+        if col_widths is None and AUTOSIZE_COLUMNS:
+            rows = format_table_rows(sample_rows(records), columns)
+            return self._autosize_col_widths([format_nullable_data(cell) for cell in header],
+                                             [[format_nullable_data(cell) for cell in row] for row in rows])
+        return self._resolve_col_widths(len(header), col_widths)
+
+    def _counted(self, rows):
+        for row in rows:
+            self.row_count += 1
+            yield row
+
+    def _autosize_col_widths(self, header, rows):
+        page_width = A4[0] - self.doc.leftMargin - self.doc.rightMargin
+        return autosize_columns(header, rows, page_width, self.table_body_style,
+                                self.table_header_style, CELL_HORIZONTAL_PADDING)
+
+    def _resolve_col_widths(self, num_cols, col_widths):
+        page_width = A4[0] - self.doc.leftMargin - self.doc.rightMargin
+        if col_widths is None:
+            col_widths = [page_width / num_cols] * num_cols # Distribui igualmente se não houver largura definida
+        else:
+            col_widths = list(col_widths)
+            total_given_width = sum(col_widths)
+            if total_given_width != page_width and total_given_width > 0:
+                col_widths = [cw * (page_width / total_given_width) for cw in col_widths]
+            if len(col_widths) < num_cols:
+                 # Adiciona larguras para colunas faltantes, distribuindo o restante
+                 remaining_width = page_width - sum(col_widths)
+                 if remaining_width < 0: remaining_width = 0 # Evita larguras negativas
+                 num_missing_cols = num_cols - len(col_widths)
+                 col_widths.extend([remaining_width / num_missing_cols] * num_missing_cols)
+            elif len(col_widths) > num_cols:
+                 col_widths = col_widths[:num_cols]
+        return col_widths
+
+    def build_pdf(self, on_page=None):
+        """Gera o PDF; `on_page(numero_da_pagina)` é chamado no início de cada página."""
+        # O conteúdo de cada página é comprimido assim que ela termina (ver page_streams.py)
+        kwargs = {'canvasmaker': PageStreamCanvas}
+        if self.compact:
+            kwargs['canvasmaker'] = compact_canvasmaker(self.compact)
+        if on_page is not None:
+            page_callback = lambda canvas, doc: on_page(doc.page)
+            kwargs.update(onFirstPage=page_callback, onLaterPages=page_callback)
+        try:
+            self.doc.build(self.story, **kwargs)
+            return True
+        except Exception as e:
+            print(f"Erro ao gerar PDF: {e}")
+            self.build_error = e
+            return False
+
+    def iter_build(self, on_page=None):
+        """Gera o PDF como build_pdf, mas pausando ao fim de cada página.
+
+        Gerador: cede o número de cada página concluída e, se a geração falhar,
+        levanta a exceção do doc.build (que também fica em build_error). Assim
+        quem entrega o PDF em streaming pode diagramar a primeira página antes
+        de enviar os cabeçalhos e interromper a resposta se uma página seguinte
+        falhar. O doc.build roda numa thread auxiliar, mas as duas se revezam:
+        só uma delas executa por vez.
+        """
+        page_done = threading.Semaphore(0)
+        resume = threading.Semaphore(0)
+        state = {'done': False, 'cancelled': False}
+        after_page = self.doc.afterPage
+
+        def paused_after_page():
+            after_page()
+            page_done.release()
+            resume.acquire()
+            if state['cancelled']:
+                raise _BuildCancelled()
+
+        def run():
+            try:
+                self.build_pdf(on_page)
+            except _BuildCancelled:
+                pass
+            finally:
+                state['done'] = True
+                page_done.release()
+
+        self.doc.afterPage = paused_after_page
+        thread = threading.Thread(target=run, name='pdf-build', daemon=True)
+        thread.start()
+        try:
+            while True:
+                page_done.acquire()
+                if state['done']:
+                    break
+                yield self.page_count
+                resume.release()
+        finally:
+            if not state['done']:
+                # Gerador fechado no meio (cliente desconectou): encerra o doc.build
+                state['cancelled'] = True
+                resume.release()
+                thread.join()
+            del self.doc.afterPage
+        if self.build_error is not None:
+            raise self.build_error
+
+    @property
+    def page_count(self):
+        return getattr(self.doc, 'page', 0)
@@ -0,0 +1,363 @@
+# src/app/api/python_pdf_generator/ingest.py
+"""Leitura incremental (streaming) do JSON da requisição.
+
+request.get_json() carrega o corpo inteiro em dicts e listas antes de qualquer
+renderização. Para relatórios com dezenas de milhares de linhas isso dobra o uso
+de memória e atrasa a primeira linha da tabela. Aqui o corpo é lido aos poucos:
+
+- LazyObject se comporta como um dict somente leitura. Acessar uma chave avança a
+  leitura do corpo até ela; valores que ficaram para trás no caminho são lidos
+  inteiros e guardados.
+- Os arrays de linhas dos relatórios (ROW_ARRAY_KEYS) viram LazyArray: um
+  iterador de passada única que lê um registro do corpo por vez, conforme o
+  add_table (LargeTable) pede mais linhas durante o doc.build.
+
+Para aproveitar a leitura sob demanda os campos escalares (type, title,
+start_date, reuniao_detalhes...) devem vir antes dos arrays no JSON; o proxy em
+generate-pdf/route.ts serializa o payload nessa ordem. Se vierem depois, o
+resultado é o mesmo, apenas sem a economia de memória.
+
+O corpo pode vir comprimido (Content-Encoding: gzip ou zstd, ver request_body):
+ele é descomprimido à medida que é lido, nos dois modos de leitura. As seções
+de linhas podem vir no formato colunar (ver columnar.py); nesse caso cada
+seção é lida inteira, já que as colunas vêm uma depois da outra. Por isso o
+proxy só usa o formato colunar em corpos abaixo de STREAM_INGEST_MIN_BYTES.
+"""
+import codecs
+import gzip
+import json
+import os
+from collections import deque
+
+from .columnar import columnar_records
+
+# Objetos lidos sob demanda (os demais são lidos inteiros)
+LAZY_OBJECT_KEYS = frozenset({'content'})
+
+# Arrays de linhas das tabelas dos relatórios
+ROW_ARRAY_KEYS = frozenset({
+    'membros_presentes', 'membros_ausentes', 'visitantes_presentes',
+    'historico_presenca', 'faltosos', 'visitantes', 'membros',
+    'lideres_alocados', 'lideres_nao_alocados', 'celulas_sem_lider_atribuido',
+    'chaves_ativas', 'chaves_usadas',
+})
+
+# A partir de qual tamanho de corpo (o recebido, comprimido ou não) a leitura
+# incremental é usada automaticamente. O cabeçalho X-PDF-Ingest: stream | buffered
+# força um dos modos (o proxy o envia quando comprime o corpo).
+STREAM_INGEST_MIN_BYTES = int(os.environ.get('PDF_STREAM_INGEST_MIN_BYTES', 1024 * 1024))
+
+# Limite do corpo depois de descomprimido (protege contra "bombas" de compressão)
+MAX_DECODED_BYTES = int(os.environ.get('PDF_MAX_DECODED_BYTES', 512 * 1024 * 1024))
+
+# Valores de Content-Encoding aceitos no corpo das requisições
+CONTENT_ENCODINGS = ('gzip', 'zstd')
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+
+class UnsupportedEncoding(ValueError):
+    """Content-Encoding que o serviço não sabe descomprimir."""
+
+
+class _LimitedReader:
+    """Repassa as leituras de `stream`, mas falha se passar de `limit` bytes."""
+
+    def __init__(self, stream, limit):
+        self._stream = stream
+        self._remaining = limit
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._stream.read(self._remaining + 1)
+        else:
+            data = self._stream.read(min(size, self._remaining + 1))
+        self._remaining -= len(data)
+        if self._remaining < 0:
+            raise ValueError(f"Corpo da requisição maior que {MAX_DECODED_BYTES} bytes depois de descomprimido")
+        return data
+
+
+def _zstd_reader(stream):
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.ZstdFile(stream)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise UnsupportedEncoding("Content-Encoding zstd requer o pacote 'zstandard'")
+    return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+
+
+def request_body(request):
+    """Stream do corpo da requisição, descomprimido conforme o Content-Encoding.
+
+    Sem compressão devolve o próprio request.stream. Levanta UnsupportedEncoding
+    se a codificação não for aceita.
+    """
+    encoding = (request.headers.get('Content-Encoding') or 'identity').strip().lower()
+    if encoding == 'identity':
+        return request.stream
+    if encoding in ('gzip', 'x-gzip'):
+        stream = gzip.GzipFile(fileobj=request.stream, mode='rb')
+    elif encoding == 'zstd':
+        stream = _zstd_reader(request.stream)
+    else:
+        raise UnsupportedEncoding(f"Content-Encoding não suportado: {encoding} "
+                                  f"(aceitos: {', '.join(CONTENT_ENCODINGS)})")
+    return _LimitedReader(stream, MAX_DECODED_BYTES)
+
+
+def load_json(request, body):
+    """Lê o corpo inteiro como JSON (como request.get_json()), a partir de `body` (ver request_body)."""
+    if body is request.stream:
+        return request.get_json()
+    if not request.is_json:
+        raise ValueError("Content-Type deve ser application/json")
+    return json.loads(body.read())
+
+
+def wants_streaming_ingest(request):
+    if not request.is_json:
+        return False
+    mode = request.headers.get('X-PDF-Ingest')
+    if mode:
+        return mode == 'stream'
+    return (request.content_length or 0) >= STREAM_INGEST_MIN_BYTES
+
+
+class JSONStreamReader:
+    """Lê valores JSON de um stream de bytes, trazendo mais dados só quando necessário."""
+
+    def __init__(self, stream, chunk_size=64 * 1024):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read_more(self, size=None):
+        if self._eof:
+            return False
+        data = self._stream.read(size or self._chunk_size)
+        # Descarta o que já foi consumido antes de acrescentar o novo pedaço
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        if not data:
+            self._eof = True
+            self._buf += self._decoder.decode(b'', final=True)
+            return False
+        self._buf += self._decoder.decode(data)
+        return True
+
+    def peek(self):
+        """Próximo caractere significativo (sem consumi-lo); '' no fim do corpo."""
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._read_more():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON inválido: esperado {char!r}, encontrado {found or 'fim do corpo'!r}")
+        self._pos += 1
+
+    def value(self):
+        """Lê um valor JSON completo."""
+        self.peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Valor incompleto no buffer: busca mais (em blocos crescentes, para
+                # que valores grandes não sejam re-decodificados muitas vezes)
+                if not self._read_more(size):
+                    raise
+                size *= 2
+                continue
+            if value.__class__ in (int, float) and self._number_may_continue(end) and self._read_more():
+                continue  # Um número no fim do buffer ("12", "-1.", "6e") pode continuar no próximo pedaço
+            self._pos = end
+            return value
+
+    def _number_may_continue(self, end):
+        buf = self._buf
+        while end < len(buf) and buf[end] in _NUMBER_CHARS:
+            end += 1
+        return end == len(buf)
+
+
+class LazyArray:
+    """Array JSON lido elemento a elemento. Pode ser percorrido uma única vez."""
+
+    def __init__(self, reader):
+        self._reader = reader
+        self._items = deque()  # Elementos já lidos e ainda não entregues
+        self._done = False
+        self._first = True
+        reader.expect('[')
+
+    def _read_item(self):
+        reader = self._reader
+        if self._done:
+            raise StopIteration
+        if reader.peek() == ']':
+            reader.expect(']')
+            self._done = True
+            raise StopIteration
+        if not self._first:
+            reader.expect(',')
+        self._first = False
+        return reader.value()
+
+    def __iter__(self):
+        items = self._items
+        while True:
+            if items:
+                yield items.popleft()
+                continue
+            try:
+                item = self._read_item()
+            except StopIteration:
+                return
+            yield item
+
+    def __bool__(self):
+        if self._items:
+            return True
+        try:
+            self._items.append(self._read_item())
+        except StopIteration:
+            return False
+        return True
+
+    def materialize(self):
+        """Lê o restante do array para a memória (necessário para avançar no corpo)."""
+        while True:
+            try:
+                self._items.append(self._read_item())
+            except StopIteration:
+                return
+
+
+class LazyObject:
+    """Objeto JSON lido sob demanda, com a interface de leitura de um dict."""
+
+    def __init__(self, reader):
+        self._reader = reader
+        self._values = {}
+        self._open_child = None  # LazyObject/LazyArray que ainda está sendo lido
+        self._done = False
+        self._first = True
+        reader.expect('{')
+
+    def _advance(self):
+        if self._open_child is not None:
+            self._open_child.materialize()
+            self._open_child = None
+        reader = self._reader
+        if reader.peek() == '}':
+            reader.expect('}')
+            self._done = True
+            return
+        if not self._first:
+            reader.expect(',')
+        self._first = False
+
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError("JSON inválido: chave de objeto deve ser string")
+        reader.expect(':')
+        start = reader.peek()
+        if start == '{' and key in LAZY_OBJECT_KEYS:
+            value = self._open_child = LazyObject(reader)
+        elif start == '[' and key in ROW_ARRAY_KEYS:
+            value = self._open_child = LazyArray(reader)
+        else:
+            value = reader.value()
+        self._values[key] = value
+
+    def materialize(self):
+        while not self._done:
+            self._advance()
+
+    def get(self, key, default=None):
+        while key not in self._values and not self._done:
+            self._advance()
+        return self._values.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __bool__(self):
+        if not self._values and not self._done:
+            self._advance()
+        return bool(self._values)
+
+    def to_dict(self):
+        """Lê tudo e converte para dicts/listas comuns."""
+        self.materialize()
+        result = {}
+        for key, value in self._values.items():
+            if isinstance(value, LazyObject):
+                value = value.to_dict()
+            elif isinstance(value, LazyArray):
+                value = list(value)
+            result[key] = value
+        return result
+
+
+_MISSING = object()
+
+
+def parse_streaming(stream, chunk_size=64 * 1024):
+    """Começa a ler o corpo JSON; retorna um LazyObject, ou None se o corpo não for um objeto."""
+    reader = JSONStreamReader(stream, chunk_size)
+    if reader.peek() != '{':
+        return None
+    return LazyObject(reader)
+
+
+class _DeferredRows:
+    """Iterável que só procura o array no corpo quando começa a ser percorrido."""
+
+    def __init__(self, content, key):
+        self._content = content
+        self._key = key
+
+    def __iter__(self):
+        return iter(columnar_records(self._content.get(self._key)) or ())
+
+
+def table_records(content, key):
+    """Registros de uma tabela do relatório.
+
+    Com um dict comum devolve o próprio valor. Com um LazyObject devolve um
+    iterável que só avança a leitura do corpo até o array quando a tabela for
+    diagramada; assim cada tabela consome o seu array, na ordem do JSON, sem que
+    os arrays anteriores precisem ser carregados de uma vez.
+
+    Seções no formato colunar viram ColumnarRecords (ver columnar.py).
+    """
+    if isinstance(content, LazyObject):
+        return _DeferredRows(content, key)
+    return columnar_records(content[key])
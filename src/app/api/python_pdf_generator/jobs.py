@@ -0,0 +1,257 @@
+# src/app/api/python_pdf_generator/jobs.py
+"""Modo assíncrono: relatórios grandes viram jobs em segundo plano.
+
+Um POST com "async": true devolve na hora (202) o id do job. O relatório é
+renderizado num pool de processos próprio (com os mesmos processos "aquecidos"
+do modo lote) e o andamento (páginas já renderizadas) fica no armazenamento de
+jobs, consultado por GET ?job_id=<id>; GET ?job_id=<id>&download=1 entrega o PDF.
+
+A fila é limitada (PDF_JOBS_MAX_QUEUED jobs na fila ou em execução): acima disso
+o envio é recusado com 429, em vez de acumular trabalho sem limite.
+
+O armazenamento é plugável (register_job_store / PDF_JOBS_STORE). O padrão,
+'filesystem', guarda o status em JSON e o PDF em PDF_JOBS_DIR, então tudo roda
+numa única máquina sem serviços externos. Como os processos do pool atualizam o
+status diretamente, os armazenamentos precisam ser serializáveis (pickle).
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from .batch import _pool_context, _warm_worker
+
+JOB_WORKERS = max(1, int(os.environ.get('PDF_JOBS_WORKERS', os.cpu_count() or 1)))
+JOBS_MAX_QUEUED = max(1, int(os.environ.get('PDF_JOBS_MAX_QUEUED', JOB_WORKERS * 4)))
+JOBS_TTL = int(os.environ.get('PDF_JOBS_TTL', 3600))  # Segundos até um job ser apagado
+JOBS_STORE = os.environ.get('PDF_JOBS_STORE', 'filesystem')
+JOBS_DIR = os.environ.get('PDF_JOBS_DIR') or os.path.join(tempfile.gettempdir(), 'pdf-jobs')
+
+# Intervalo mínimo entre duas gravações de progresso de um mesmo job
+PROGRESS_INTERVAL = 0.5
+PURGE_INTERVAL = 60
+
+JOB_STATUSES = ('queued', 'running', 'done', 'error')
+
+
+class JobQueueFull(Exception):
+    """A fila de jobs está cheia; o cliente deve tentar de novo mais tarde."""
+
+
+class JobStore:
+    """Interface dos armazenamentos de jobs."""
+
+    def create(self, job_id, fields):
+        raise NotImplementedError
+
+    def update(self, job_id, **fields):
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """Status do job (dict) ou None se não existir."""
+        raise NotImplementedError
+
+    def save_result(self, job_id, data):
+        raise NotImplementedError
+
+    def open_result(self, job_id):
+        """Arquivo binário aberto com o PDF do job, ou None."""
+        raise NotImplementedError
+
+    def purge(self, older_than):
+        """Apaga jobs criados antes do timestamp `older_than`."""
+        raise NotImplementedError
+
+
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class FileSystemJobStore(JobStore):
+    """<dir>/<job_id>.json com o status e <dir>/<job_id>.pdf com o resultado."""
+
+    def __init__(self, directory=JOBS_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id, ext):
+        if not _JOB_ID_RE.match(job_id or ''):
+            raise KeyError(job_id)
+        return os.path.join(self.directory, f"{job_id}.{ext}")
+
+    def _write(self, path, data):
+        # Escrita atômica: quem consulta o status nunca lê um arquivo pela metade
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def create(self, job_id, fields):
+        self._write(self._path(job_id, 'json'), json.dumps(fields, default=str).encode('utf-8'))
+
+    def update(self, job_id, **fields):
+        # Só o processo que executa o job grava depois da criação: sem disputa
+        status = self.get(job_id) or {}
+        status.update(fields)
+        self.create(job_id, status)
+
+    def get(self, job_id):
+        try:
+            with open(self._path(job_id, 'json'), 'rb') as f:
+                return json.loads(f.read())
+        except (KeyError, OSError, ValueError):
+            return None
+
+    def save_result(self, job_id, data):
+        self._write(self._path(job_id, 'pdf'), data)
+
+    def open_result(self, job_id):
+        try:
+            return open(self._path(job_id, 'pdf'), 'rb')
+        except (KeyError, OSError):
+            return None
+
+    def purge(self, older_than):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.stat(path).st_mtime < older_than:
+                    os.remove(path)
+            except OSError:
+                continue
+
+
+JOB_STORES = {'filesystem': FileSystemJobStore}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def register_job_store(name, factory):
+    """Registra (ou substitui) um armazenamento; `factory()` cria a instância."""
+    global _store
+    with _store_lock:
+        JOB_STORES[name] = factory
+        _store = None
+
+
+def get_job_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            factory = JOB_STORES.get(JOBS_STORE)
+            if factory is None:
+                raise RuntimeError(f"Armazenamento de jobs desconhecido: {JOBS_STORE}")
+            _store = factory()
+        return _store
+
+
+def run_job(store, job_id, report_type, report_title, report_content, theme, compact=None):
+    """Executado no processo do pool: renderiza e grava o progresso e o resultado."""
+    from .generator import PDFGenerator
+    from .route import render_report
+
+    store.update(job_id, status='running', started_at=time.time())
+    last_update = 0.0
+
+    def on_page(page):
+        nonlocal last_update
+        now = time.monotonic()
+        if now - last_update >= PROGRESS_INTERVAL:
+            last_update = now
+            store.update(job_id, pages_rendered=page - 1)  # A página `page` está começando
+
+    try:
+        buffer = BytesIO()
+        pdf_gen = PDFGenerator(buffer, theme=theme, compact=compact)
+        render_report(pdf_gen, report_type, report_title, report_content)
+        if not pdf_gen.build_pdf(on_page=on_page):
+            raise RuntimeError(f"Falha ao gerar o PDF: {pdf_gen.build_error}")
+        data = buffer.getvalue()
+        store.save_result(job_id, data)
+    except Exception as e:
+        store.update(job_id, status='error', error=str(e), finished_at=time.time())
+        return False
+    store.update(job_id, status='done', pages_rendered=pdf_gen.page_count, rows=pdf_gen.row_count,
+                 bytes=len(data), finished_at=time.time())
+    return True
+
+
+_pool = None
+_active = 0  # Jobs na fila ou em execução neste processo
+_last_purge = 0.0
+_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Mesmo contexto do pool do modo lote: sem fork com outras threads renderizando
+        _pool = ProcessPoolExecutor(max_workers=JOB_WORKERS, initializer=_warm_worker,
+                                    mp_context=_pool_context())
+    return _pool
+
+
+def _job_finished(store, job_id, future):
+    global _active, _pool
+    with _lock:
+        _active -= 1
+    error = future.exception()
+    if error is not None:
+        # O processo morreu (ou o job nem chegou a rodar): o status ficaria parado
+        print(f"Erro no job {job_id}: {error}")
+        store.update(job_id, status='error', error=str(error), finished_at=time.time())
+        with _lock:
+            broken = _pool if getattr(_pool, '_broken', False) else None
+            if broken is not None:
+                _pool = None
+        if broken is not None:
+            # Os jobs de um pool quebrado já falharam: não há o que cancelar
+            broken.shutdown(wait=False)
+
+
+def submit_job(report_type, report_title, report_content, theme=None, compact=None, filename=None):
+    """Enfileira o relatório e retorna o id do job. Levanta JobQueueFull se a fila estiver cheia."""
+    global _active, _last_purge
+    store = get_job_store()
+    now = time.time()
+    with _lock:
+        if _active >= JOBS_MAX_QUEUED:
+            raise JobQueueFull(f"Fila de jobs cheia ({JOBS_MAX_QUEUED} jobs)")
+        _active += 1
+        purge = now - _last_purge >= PURGE_INTERVAL
+        if purge:
+            _last_purge = now
+
+    if purge:
+        store.purge(now - JOBS_TTL)
+
+    job_id = uuid.uuid4().hex
+    try:
+        store.create(job_id, {'job_id': job_id, 'status': 'queued', 'report_type': report_type,
+                              'title': report_title, 'filename': filename or 'relatorio.pdf',
+                              'pages_rendered': 0, 'created_at': now})
+        with _lock:
+            pool = _get_pool()
+        future = pool.submit(run_job, store, job_id, report_type, report_title, report_content, theme,
+                             compact)
+    except Exception:
+        with _lock:
+            _active -= 1
+        raise
+    future.add_done_callback(lambda f: _job_finished(store, job_id, f))
+    return job_id
+
+
+def get_job_stats():
+    with _lock:
+        return {'active': _active, 'max_queued': JOBS_MAX_QUEUED, 'workers': JOB_WORKERS,
+                'store': JOBS_STORE}
@@ -0,0 +1,38 @@
+# src/app/api/python_pdf_generator/page_streams.py
+"""Canvas que comprime o conteúdo de cada página assim que ela é fechada.
+
+O ReportLab guarda o conteúdo de todas as páginas como texto (~10 KB por página
+de tabela) até o canvas.save, quando o documento inteiro é formatado e
+comprimido. Em relatórios com milhares de páginas esse texto é a maior parte da
+memória usada durante o doc.build. O PageStreamCanvas aplica os mesmos filtros
+(ASCII85 + Flate, conforme o rl_config) já no showPage e guarda só o resultado,
+com o /Filter no dicionário da stream: o PDF gerado é o mesmo, byte a byte.
+"""
+from reportlab import rl_config
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen.canvas import Canvas
+
+
+class PageStreamCanvas(Canvas):
+
+    def page_filters(self):
+        """Filtros das streams de conteúdo, na ordem do /Filter (os mesmos do PDFPage)."""
+        if rl_config.useA85:
+            return [pdfdoc.PDFBase85Encode, pdfdoc.PDFZCompress]
+        return [pdfdoc.PDFZCompress]
+
+    def showPage(self):
+        super().showPage()
+        page = self._doc.Pages.pages[-1]
+        if page.Contents or not page.stream or not page.compression:
+            return
+        filters = self.page_filters()
+        content = page.stream
+        for stream_filter in reversed(filters):
+            content = stream_filter.encode(content)
+        stream = pdfdoc.PDFStream(content=content)
+        # Com o /Filter já definido o PDFStream não aplica os filtros de novo
+        stream.dictionary['Filter'] = pdfdoc.PDFArray([pdfdoc.PDFName(f.pdfname) for f in filters])
+        stream.__Comment__ = "page stream"
+        page.Contents = stream
+        page.stream = None
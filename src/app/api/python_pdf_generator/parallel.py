@@ -0,0 +1,230 @@
+# src/app/api/python_pdf_generator/parallel.py
+"""Renderização paralela de um único relatório grande.
+
+O doc.build do ReportLab roda num só núcleo. No modo paralelo ("parallel": true
+no payload ou PDF_PARALLEL=1, ver route.py) o ParallelPDFGenerator recebe do
+render_report as mesmas chamadas de montagem do PDFGenerator (add_title,
+add_records_table...), mas só as registra. No build_pdf:
+
+- as tabelas grandes (LARGE_TABLE_MIN_ROWS linhas ou mais) são divididas em
+  faixas de PARALLEL_PART_ROWS linhas; cada parte do relatório leva uma ou mais
+  faixas e, a primeira, também o que vem antes (título, textos, títulos das
+  seções) e a última o que vem depois;
+- as partes são renderizadas em paralelo no pool de processos do modo lote
+  (batch.get_pool), cujos processos já têm fontes e estilos prontos;
+- os PDFs das partes são juntados, na ordem, com o pypdf.
+
+Cada faixa é uma LargeTable comum: começa numa página nova com o cabeçalho
+repetido, e o zebrado continua de onde a faixa anterior parou (row_offset). As
+larguras das colunas são calculadas uma vez, de uma amostra da tabela inteira,
+como no modo normal (large_table_col_widths), e valem para todas as faixas. A numeração das
+páginas é contínua: on_page recebe o número da página no documento final.
+
+As tabelas da ingestão em streaming (ver ingest.py) são lidas inteiras para a
+memória no build_pdf, já que precisam ser contadas e fatiadas.
+
+A diferença para o PDF gerado num só processo é a última página de cada parte,
+que pode não ficar cheia, e as fontes, que são embutidas uma vez por parte.
+Relatórios abaixo de PARALLEL_MIN_ROWS linhas em tabelas grandes são gerados
+normalmente, no próprio processo, e saem idênticos aos do modo normal.
+"""
+import os
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from itertools import chain
+
+from .batch import DEFAULT_BATCH_WORKERS, _discard_pool, get_pool, submit_limited
+from .columnar import ColumnarRecords
+from .formatters import check_records, iter_table_rows
+
+# A partir de quantas linhas (somando as tabelas grandes) o relatório é dividido.
+PARALLEL_MIN_ROWS = int(os.environ.get('PDF_PARALLEL_MIN_ROWS', '10000'))
+# Linhas por parte. Fixo (não depende do número de processos) para que o mesmo
+# relatório gere sempre o mesmo PDF, o que o cache/ETag exige.
+PARALLEL_PART_ROWS = int(os.environ.get('PDF_PARALLEL_PART_ROWS', '2500'))
+
+
+class _ReadRows(list):
+    """Registros lidos de um iterável; no modo normal voltam a ser passados como iterável."""
+
+
+def _replay(pdf_gen, calls):
+    """Executa as chamadas de montagem registradas no gerador `pdf_gen`."""
+    for name, args, kwargs in calls:
+        if name == 'table_range':
+            header, records, columns, col_widths, row_offset = args
+            pdf_gen.add_table(chain([header], iter_table_rows(records, columns)), col_widths,
+                              large=True, row_offset=row_offset)
+        elif name == 'add_records_table' and isinstance(args[1], _ReadRows):
+            pdf_gen.add_records_table(args[0], iter(args[1]), *args[2:], **kwargs)
+        else:
+            getattr(pdf_gen, name)(*args, **kwargs)
+
+
+def render_part(calls, theme, compact=None):
+    """Executado no processo do pool: (bytes do PDF, páginas, linhas) de uma parte."""
+    from .generator import PDFGenerator
+    buffer = BytesIO()
+    pdf_gen = PDFGenerator(buffer, theme=theme, compact=compact)
+    _replay(pdf_gen, calls)
+    if not pdf_gen.build_pdf():
+        raise RuntimeError(f"Falha ao gerar o PDF: {pdf_gen.build_error}")
+    return buffer.getvalue(), pdf_gen.page_count, pdf_gen.row_count
+
+
+def _carry_over(calls):
+    """Tira do fim de `calls` (e devolve) o que veio depois da última faixa de tabela.
+
+    Uma tabela que começa numa parte nova leva junto o título da sua seção.
+    """
+    last = max(i for i, call in enumerate(calls) if call[0] == 'table_range')
+    moved = calls[last + 1:]
+    del calls[last + 1:]
+    return moved
+
+
+class ParallelPDFGenerator:
+    """Registra as chamadas de montagem do PDFGenerator e renderiza o relatório em partes.
+
+    Tem a interface usada pelo route.py (build_pdf, build_error, row_count,
+    page_count), então pode substituir o PDFGenerator na geração de um PDF. A
+    pré-visualização (ver preview.py) não é dividida em partes.
+    """
+
+    def __init__(self, buffer_obj, theme=None, compact=None, preview=None):
+        if preview:
+            raise ValueError("A pré-visualização não é gerada no modo paralelo")
+        self.buffer = buffer_obj
+        self.theme = theme
+        self.compact = compact
+        self.calls = []
+        self.build_error = None
+        self.row_count = 0
+        self.page_count = 0
+        self.part_count = 0
+
+    def _record(self, name, *args, **kwargs):
+        self.calls.append((name, args, kwargs))
+
+    def add_title(self, text):
+        self._record('add_title', text)
+
+    def add_section_heading(self, text):
+        self._record('add_section_heading', text)
+
+    def add_subsection_heading(self, text):
+        self._record('add_subsection_heading', text)
+
+    def add_paragraph(self, text):
+        self._record('add_paragraph', text)
+
+    def add_spacer(self, *args, **kwargs):
+        self._record('add_spacer', *args, **kwargs)
+
+    def add_small_italic_text(self, text):
+        self._record('add_small_italic_text', text)
+
+    def add_table(self, data, *args, **kwargs):
+        # Iteráveis não vão para outro processo: a tabela é materializada
+        self._record('add_table', data if isinstance(data, list) else list(data), *args, **kwargs)
+
+    def add_records_table(self, header, records, columns, empty_text, col_widths=None):
+        check_records(records, columns)
+        self._record('add_records_table', header, records, columns, empty_text, col_widths=col_widths)
+
+    def _large_tables(self, min_rows):
+        """Índices das chamadas add_records_table com `min_rows` linhas ou mais."""
+        for i, (name, args, kwargs) in enumerate(self.calls):
+            if name != 'add_records_table' or args[1] is None:
+                continue
+            records = args[1]
+            if not isinstance(records, (list, tuple, ColumnarRecords)):
+                records = _ReadRows(records)
+                self.calls[i] = (name, args[:1] + (records,) + args[2:], kwargs)
+            if len(records) >= min_rows:
+                yield i
+
+    def split_parts(self, pdf_gen):
+        """Listas de chamadas de cada parte; `pdf_gen` calcula as larguras das colunas."""
+        from .generator import LARGE_TABLE_MIN_ROWS
+        large = set(self._large_tables(LARGE_TABLE_MIN_ROWS))
+        if sum(len(self.calls[i][1][1]) for i in large) < PARALLEL_MIN_ROWS:
+            return [self.calls]
+        part_rows = max(1, PARALLEL_PART_ROWS)
+        parts = [[]]
+        filled = 0
+        for i, call in enumerate(self.calls):
+            if i not in large:
+                parts[-1].append(call)
+                continue
+            header, records, columns, _ = call[1]
+            col_widths = pdf_gen.large_table_col_widths(header, records, columns, call[2]['col_widths'])
+            offset = 0
+            while offset < len(records):
+                if filled >= part_rows:
+                    parts.append(_carry_over(parts[-1]) if offset == 0 else [])
+                    filled = 0
+                stop = min(offset + part_rows - filled, len(records))
+                parts[-1].append(('table_range', (header, records[offset:stop], columns, col_widths, offset), {}))
+                filled += stop - offset
+                offset = stop
+        return parts
+
+    def build_pdf(self, on_page=None):
+        """Gera o PDF (em partes, se o relatório for grande); mesma interface do PDFGenerator."""
+        from .generator import PDFGenerator
+        pdf_gen = PDFGenerator(self.buffer, theme=self.theme, compact=self.compact)
+        try:
+            parts = self.split_parts(pdf_gen)
+        except Exception as e:
+            print(f"Erro ao gerar PDF: {e}")
+            self.build_error = e
+            return False
+        self.part_count = len(parts)
+        if len(parts) == 1:
+            # Pequeno demais para compensar: gerado aqui mesmo, como no modo normal
+            _replay(pdf_gen, self.calls)
+            built = pdf_gen.build_pdf(on_page)
+            self.build_error = pdf_gen.build_error
+            self.row_count, self.page_count = pdf_gen.row_count, pdf_gen.page_count
+            return built
+
+        try:
+            from pypdf import PdfReader, PdfWriter
+        except ImportError:
+            self.build_error = RuntimeError("O modo paralelo requer o pacote 'pypdf'")
+            print(f"Erro ao gerar PDF: {self.build_error}")
+            return False
+
+        pool = get_pool()
+        futures = []
+        writer = PdfWriter()
+        try:
+            futures = submit_limited(pool, render_part, ((calls, self.theme, self.compact) for calls in parts),
+                                     DEFAULT_BATCH_WORKERS)
+            for future in futures:
+                data, pages, rows = future.result()
+                writer.append(PdfReader(BytesIO(data)))
+                if on_page is not None:
+                    for page in range(self.page_count + 1, self.page_count + pages + 1):
+                        on_page(page)
+                self.page_count += pages
+                self.row_count += rows
+            merged = BytesIO()
+            writer.write(merged)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _discard_pool(pool)
+            for future in futures:
+                future.cancel()
+            print(f"Erro ao gerar PDF: {e}")
+            self.build_error = e
+            return False
+        self.buffer.write(merged.getvalue())
+        return True
+
+    def iter_build(self, on_page=None):
+        """Mesma interface do PDFGenerator.iter_build; as partes são geradas de uma vez."""
+        if not self.build_pdf(on_page):
+            raise self.build_error
+        yield self.page_count
@@ -0,0 +1,137 @@
+# src/app/api/python_pdf_generator/preview.py
+"""Modo de pré-visualização: só as primeiras páginas/linhas do relatório.
+
+Com "preview" no payload (ver route.preview_options):
+- cada tabela leva no máximo `rows` linhas; o total real de linhas da seção é
+  contado sem formatar nem diagramar o resto (limit_records);
+- o doc.build para ao fim da página `pages`, ou da primeira página que terminar
+  depois do orçamento de tempo (PDF_PREVIEW_BUDGET_MS), fechando a LazyStory:
+  o restante da story nunca vira flowable;
+- toda página leva um rodapé avisando que é uma pré-visualização, com os totais
+  de cada seção.
+
+O corte pelo limite de páginas é determinístico; o corte pelo tempo depende da
+máquina e da carga (timed_out), então esse PDF não vai para o cache nem leva
+ETag (ver route.py).
+
+Como as tabelas são cortadas antes da diagramação, o custo da pré-visualização
+não depende do tamanho do relatório (só a contagem das linhas, que é linear e
+barata).
+"""
+import os
+import time
+from itertools import islice
+
+from reportlab.lib.units import cm
+from reportlab.lib.utils import simpleSplit
+from reportlab.platypus import SimpleDocTemplate
+
+from .columnar import ColumnarRecords
+
+# Tempo máximo de geração de uma pré-visualização, contado da criação do
+# PDFGenerator: a página em andamento é concluída e o documento termina nela.
+PREVIEW_BUDGET_MS = int(os.environ.get('PDF_PREVIEW_BUDGET_MS', '1500'))
+
+FOOTER_FONT_SIZE = 7
+FOOTER_MAX_LINES = 3
+
+
+def limit_records(records, limit):
+    """As primeiras `limit` linhas de `records` e o total de linhas.
+
+    Listas e tabelas colunares são fatiadas; nos outros iteráveis (os arrays da
+    ingestão em streaming, ver ingest.py) o restante é só contado, sem ficar na
+    memória.
+    """
+    if records is None:
+        return records, 0
+    if isinstance(records, (list, tuple, ColumnarRecords)):
+        return records[:limit], len(records)
+    iterator = iter(records)
+    head = list(islice(iterator, limit))
+    return head, len(head) + sum(1 for _ in iterator)
+
+
+def format_count(count):
+    """Número com separador de milhar no padrão brasileiro (20.000)."""
+    return f"{count:,}".replace(',', '.')
+
+
+class PreviewDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate que encerra o documento ao atingir o limite de páginas ou de tempo.
+
+    `story` é a LazyStory passada ao build (fechada para encerrar) e `totals`
+    a lista de (seção, total de linhas) mostrada no rodapé.
+    """
+
+    def __init__(self, filename, max_pages=None, deadline=None, font_name='Helvetica',
+                 text_color=None, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_pages = max_pages
+        self.deadline = deadline
+        self.font_name = font_name
+        self.text_color = text_color
+        self.story = None
+        self.totals = []
+        self.truncated = False
+        self.timed_out = False  # Cortado pelo orçamento de tempo, não pelo limite de páginas
+        self._in_flowable = False
+
+    def handle_flowable(self, flowables):
+        # afterPage roda dentro daqui quando um flowable não cabe e a página vira
+        self._in_flowable = True
+        try:
+            super().handle_flowable(flowables)
+        finally:
+            self._in_flowable = False
+
+    def _limit_reached(self):
+        """'pages', 'deadline' ou None; o limite de páginas tem precedência."""
+        if self.max_pages and self.page >= self.max_pages:
+            return 'pages'
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return 'deadline'
+        return None
+
+    def afterPage(self):
+        limit = None if self.story is None or self.truncated else self._limit_reached()
+        if limit:
+            # Só há corte se ainda sobrar algo: o flowable que não coube nesta
+            # página (está sendo tratado agora) ou o resto da story.
+            if self._in_flowable or len(self.story):
+                self.truncated = True
+                self.timed_out = limit == 'deadline'
+                self.story.close()
+        self._draw_footer()
+
+    def footer_text(self):
+        text = "Pré-visualização"
+        if self.truncated:
+            text += f" (primeiras {format_count(self.page)} páginas)" if self.page > 1 else " (primeira página)"
+        if self.totals:
+            text += " · Totais: " + "; ".join(f"{section}: {format_count(total)} linhas"
+                                              for section, total in self.totals)
+        return text
+
+    def _draw_footer(self):
+        canv = self.canv
+        lines = simpleSplit(self.footer_text(), self.font_name, FOOTER_FONT_SIZE, self.width)
+        if len(lines) > FOOTER_MAX_LINES:
+            lines = lines[:FOOTER_MAX_LINES]
+            lines[-1] += " …"
+        canv.saveState()
+        canv.setFont(self.font_name, FOOTER_FONT_SIZE)
+        if self.text_color is not None:
+            canv.setFillColor(self.text_color)
+        y = self.bottomMargin - 0.8 * cm
+        for line in lines:
+            canv.drawString(self.leftMargin, y, line)
+            y -= FOOTER_FONT_SIZE * 1.3
+        canv.restoreState()
+
+
+def preview_deadline(budget_ms=PREVIEW_BUDGET_MS):
+    """Instante (time.perf_counter) em que a pré-visualização deve terminar; None sem orçamento."""
+    if budget_ms <= 0:
+        return None
+    return time.perf_counter() + budget_ms / 1000
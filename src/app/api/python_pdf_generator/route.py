@@ -1,208 +1,363 @@
 # src/app/api/python_pdf_generator/route.py
 
 # Importações necessárias para o ambiente Vercel Python e ReportLab
+import time
+_IMPORT_STARTED = time.perf_counter() # Início da importação do serviço (medição do cold start)
+
 import json
 import os
 from io import BytesIO
 from werkzeug.wrappers import Request, Response # Vercel runtime fornece Request e Response
-
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from werkzeug.wsgi import wrap_file
 
 # Importe suas funções de formatação do mesmo diretório.
 # O ponto '.' indica o diretório atual.
+# O ReportLab, as fontes e os estilos ficam em generator.py, importado só quando
+# um PDF vai ser gerado (ver load_pdf_generator); os modos lote (batch.py),
+# paralelo (parallel.py) e assíncrono (jobs.py), que trazem o multiprocessing,
+# também são importados sob demanda.
 from .formatters import format_phone_number_for_pdf, format_date_for_pdf, format_nullable_data
+from .cache import pdf_cache, make_cache_key, get_cache_stats
+from .exports import EXPORT_FORMATS, EXPORT_WRITERS, ReportExport, export_filename
+from .ingest import (CONTENT_ENCODINGS, LazyObject, UnsupportedEncoding, load_json, parse_streaming,
+                     request_body, table_records, wants_streaming_ingest)
+from .streaming import ChunkedResponseWriter, streaming_response
+from .timing import RequestTimer, mark_import
+
+# Com PDF_FAST_START=0 o gerador (ReportLab, fontes, estilos) é carregado já na
+# importação, como antes; útil em servidores de longa duração, que preferem
+# pagar esse custo antes da primeira requisição.
+FAST_START = os.environ.get('PDF_FAST_START', '1') != '0'
+
+# Se o PDF é entregue em streaming por padrão (o payload pode pedir com "stream": true).
+STREAM_RESPONSES = os.environ.get('PDF_STREAM_RESPONSES', '0') == '1'
+
+# Modo compacto (ver compact.py): se vale por padrão e o nível de compressão (1 a 9)
+# usado quando o payload pede só "compact": true.
+COMPACT_OUTPUT = os.environ.get('PDF_COMPACT', '0') == '1'
+COMPACT_LEVEL = min(9, max(1, int(os.environ.get('PDF_COMPACT_LEVEL', '6'))))
+
+# Pré-visualização (ver preview.py): limites usados quando o payload pede só
+# "preview": true ou não informa algum deles.
+PREVIEW_PAGES = int(os.environ.get('PDF_PREVIEW_PAGES', '2'))
+PREVIEW_ROWS = int(os.environ.get('PDF_PREVIEW_ROWS', '100'))
+
+# Se um relatório grande é renderizado em partes paralelas por padrão (ver
+# parallel.py); o payload pode pedir com "parallel": true ou false.
+PARALLEL_RENDER = os.environ.get('PDF_PARALLEL', '0') == '1'
+
+
+def load_pdf_generator(parallel=False):
+    """Importa (na primeira chamada) e retorna a classe PDFGenerator (ou a do modo paralelo)."""
+    if parallel:
+        from .parallel import ParallelPDFGenerator
+        return ParallelPDFGenerator
+    from .generator import PDFGenerator
+    return PDFGenerator
 
-# --- Configuração da Fonte (Refatoração 1.1) ---
-# O caminho para as fontes deve ser relativo ao diretório do script,
-# funcionando em ambiente Vercel (onde os arquivos são empacotados).
-FONT_FOLDER = os.path.join(os.path.dirname(__file__), 'fonts')
-DEFAULT_FONT_NORMAL = 'DejaVuSans'
-DEFAULT_FONT_BOLD = 'DejaVuSans-Bold'
 
-try:
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
+def compact_level(value):
+    """Nível de compressão pedido em "compact" (true, false ou 1 a 9); None = modo normal.
+
+    Levanta ValueError se o valor não for válido.
+    """
+    if value is None:
+        value = COMPACT_OUTPUT
+    if value is True:
+        return COMPACT_LEVEL
+    if value is False or value == 0:
+        return None
+    if isinstance(value, int) and 1 <= value <= 9:
+        return value
+    raise ValueError("'compact' deve ser true, false ou um nível de compressão de 1 a 9")
+
+
+def preview_options(value):
+    """Limites pedidos em "preview" (true, false ou {"pages": n, "rows": n}); None = relatório completo.
+
+    Levanta ValueError se o valor não for válido.
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        value = {}
+    if not isinstance(value, dict) or set(value) - {'pages', 'rows'}:
+        raise ValueError("'preview' deve ser true, false ou um objeto com 'pages' e/ou 'rows'")
+    options = {'pages': value.get('pages', PREVIEW_PAGES), 'rows': value.get('rows', PREVIEW_ROWS)}
+    for key, limit in options.items():
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+            raise ValueError(f"'preview.{key}' deve ser um inteiro positivo")
+    return options
+
+
+def normalize_report_type(report_type):
+    # CORREÇÃO AQUI: Garante que o tipo de relatório seja tratado consistentemente
+    if report_type == "faltosos_periodo":
+        return "faltosos"
+    return report_type
+
+
+def render_report(pdf_gen, report_type, report_title, report_content):
+    """Monta no `pdf_gen` a story do relatório (título, seções e tabelas), sem gerar o PDF."""
+    # --- Lógica de Geração de PDF (baseada no seu código original) ---
+    pdf_gen.add_title(report_title)
+
+    if report_type == "presenca_reuniao":
+        details = report_content["reuniao_detalhes"]
+        membros_presentes = table_records(report_content, "membros_presentes")
+        membros_ausentes = table_records(report_content, "membros_ausentes")
+        visitantes_presentes = table_records(report_content, "visitantes_presentes")
+
+        pdf_gen.add_subsection_heading("Detalhes da Reunião:")
+        pdf_gen.add_paragraph(f"Data: {format_date_for_pdf(details['data_reuniao'])}")
+        pdf_gen.add_paragraph(f"Tema: {format_nullable_data(details['tema'])}")
+        pdf_gen.add_paragraph(f"Ministrador 1: {format_nullable_data(details.get('ministrador_principal_nome'))}")
+        if details.get('ministrador_secundario_nome'):
+            pdf_gen.add_paragraph(f"Ministrador 2: {format_nullable_data(details['ministrador_secundario_nome'])}")
+        if details.get('responsavel_kids_nome'):
+            pdf_gen.add_paragraph(f"Responsável Kids: {format_nullable_data(details['responsavel_kids_nome'])}")
+        pdf_gen.add_paragraph(f"Crianças Presentes: {format_nullable_data(details.get('num_criancas', 0))}")
+        pdf_gen.add_spacer()
+
+        pdf_gen.add_section_heading("Membros Presentes")
+        pdf_gen.add_records_table(["Nome", "Telefone"], membros_presentes,
+                                  [('nome', 'text'), ('telefone', 'phone')],
+                                  "Nenhum membro presente registrado.")
+
+        pdf_gen.add_section_heading("Membros Ausentes")
+        pdf_gen.add_records_table(["Nome", "Telefone"], membros_ausentes,
+                                  [('nome', 'text'), ('telefone', 'phone')],
+                                  "Nenhum membro ausente registrado.")
+
+        pdf_gen.add_section_heading("Visitantes Presentes")
+        pdf_gen.add_records_table(["Nome", "Telefone"], visitantes_presentes,
+                                  [('nome', 'text'), ('telefone', 'phone')],
+                                  "Nenhum visitante presente registrado.")
+
+    elif report_type == "presenca_membro":
+        membro_data = report_content["membro_data"]
+        historico_presenca = table_records(report_content, "historico_presenca")
+
+        pdf_gen.add_subsection_heading(f"Membro: {format_nullable_data(membro_data['nome'])}")
+        pdf_gen.add_paragraph(f"Telefone: {format_phone_number_for_pdf(membro_data['telefone'])}")
+        pdf_gen.add_paragraph(f"Data de Ingresso: {format_date_for_pdf(membro_data['data_ingresso'])}")
+        if membro_data.get('data_nascimento'):
+            pdf_gen.add_paragraph(f"Data de Nascimento: {format_date_for_pdf(membro_data['data_nascimento'])}")
+        pdf_gen.add_spacer()
+
+        pdf_gen.add_section_heading("Histórico de Presença:")
+        pdf_gen.add_records_table(["Data da Reunião", "Tema", "Presente?"], historico_presenca,
+                                  [('data_reuniao', 'date'), ('tema', 'text'), ('presente', 'boolean')],
+                                  "Nenhum histórico de presença encontrado para este membro.")
+
+    elif report_type == "faltosos":
+        faltosos = table_records(report_content, "faltosos")
+        start_date = report_content["start_date"]
+        end_date = report_content["end_date"]
+
+        pdf_gen.add_paragraph(f"Período: {format_date_for_pdf(start_date)} a {format_date_for_pdf(end_date)}")
+        pdf_gen.add_spacer()
+
+        pdf_gen.add_section_heading("Membros Faltosos:")
+        pdf_gen.add_records_table(["Nome", "Telefone", "Presenças", "Reuniões no Período"], faltosos,
+                                  [('nome', 'text'), ('telefone', 'phone'), ('total_presencas', 'text'), ('total_reunioes_no_periodo', 'text')],
+                                  "Nenhum membro com ausência registrado neste período.")
+
+    elif report_type == "visitantes_periodo":
+        visitantes = table_records(report_content, "visitantes")
+        start_date = report_content["start_date"]
+        end_date = report_content["end_date"]
+
+        pdf_gen.add_paragraph(f"Período: {format_date_for_pdf(start_date)} a {format_date_for_pdf(end_date)}")
+        pdf_gen.add_spacer()
+
+        pdf_gen.add_section_heading("Visitantes por Período:")
+        pdf_gen.add_records_table(["Nome", "Telefone", "Primeira Visita"], visitantes,
+                                  [('nome', 'text'), ('telefone', 'phone'), ('data_primeira_visita', 'date')],
+                                  "Nenhum visitante registrado neste período.")
     
-    # Registra a fonte DejaVu Sans (normal e bold)
-    # Garante que os arquivos .ttf estão na pasta 'fonts' dentro do mesmo diretório
-    pdfmetrics.registerFont(TTFont(DEFAULT_FONT_NORMAL, os.path.join(FONT_FOLDER, 'DejaVuSans.ttf')))
-    pdfmetrics.registerFont(TTFont(DEFAULT_FONT_BOLD, os.path.join(FONT_FOLDER, 'DejaVuSans-Bold.ttf')))
+    elif report_type == "aniversariantes_mes":
+        membros_aniversariantes = table_records(report_content, "membros")
+        visitantes_aniversariantes = table_records(report_content, "visitantes")
+        
+        pdf_gen.add_paragraph(f"Este relatório lista membros e visitantes que fazem aniversário no mês selecionado.")
+        pdf_gen.add_spacer()
+
+        pdf_gen.add_section_heading("Membros Aniversariantes:")
+        pdf_gen.add_records_table(["Nome", "Data Nasc.", "Telefone", "Célula"], membros_aniversariantes,
+                                  [('nome', 'text'), ('data_nascimento', 'date'), ('telefone', 'phone'), ('celula_nome', 'text')],
+                                  "Nenhum membro aniversariante neste mês.")
+
+        pdf_gen.add_section_heading("Visitantes Aniversariantes:")
+        pdf_gen.add_records_table(["Nome", "Data Nasc.", "Telefone", "Célula"], visitantes_aniversariantes,
+                                  [('nome', 'text'), ('data_nascimento', 'date'), ('telefone', 'phone'), ('celula_nome', 'text')],
+                                  "Nenhum visitante aniversariante neste mês.")
     
-    # Mapeamento para que ReportLab use suas fontes para estilos "normal" e "bold"
-    from reportlab.lib.fonts import addMapping
-    addMapping('Helvetica', 0, 0, DEFAULT_FONT_NORMAL) # Mapeia Helvetica padrão para DejaVu Sans normal
-    addMapping('Helvetica', 1, 0, DEFAULT_FONT_BOLD)   # Mapeia Helvetica Bold para DejaVu Sans bold
-    # Também mapear os nomes diretos para segurança
-    addMapping(DEFAULT_FONT_NORMAL, 0, 0, DEFAULT_FONT_NORMAL)
-    addMapping(DEFAULT_FONT_NORMAL, 1, 0, DEFAULT_FONT_BOLD)
+    elif report_type == "alocacao_lideres":
+        lideres_alocados = table_records(report_content, "lideres_alocados")
+        lideres_nao_alocados = table_records(report_content, "lideres_nao_alocados")
+        celulas_sem_lider_atribuido = table_records(report_content, "celulas_sem_lider_atribuido")
+        total_perfis_lider = report_content["total_perfis_lider"]
+        total_celulas = report_content["total_celulas"]
+
+        pdf_gen.add_paragraph(f"Total de Perfis de Líder/Admin: {format_nullable_data(total_perfis_lider)}")
+        pdf_gen.add_paragraph(f"Total de Células Registradas: {format_nullable_data(total_celulas)}")
+        pdf_gen.add_spacer()
+
+        pdf_gen.add_section_heading("Líderes Alocados em Células:")
+        pdf_gen.add_records_table(["Email", "Role", "Célula Associada", "Último Login"], lideres_alocados,
+                                  [('email', 'text'), ('role', 'text'), ('celula_nome', 'text'), ('ultimo_login', 'date')],
+                                  "Nenhum líder alocado em célula encontrado.")
+
+        pdf_gen.add_section_heading("Líderes sem Célula Alocada no Perfil:")
+        pdf_gen.add_paragraph("Usuários com a função 'líder' mas sem vínculo a uma célula no perfil.")
+        pdf_gen.add_records_table(["Email", "Role", "Data Criação", "Último Login"], lideres_nao_alocados,
+                                  [('email', 'text'), ('role', 'text'), ('data_criacao_perfil', 'date'), ('ultimo_login', 'date')],
+                                  "Nenhum líder sem célula alocada encontrado.")
+
+        pdf_gen.add_section_heading("Células sem Líder Atribuído em Perfis:")
+        pdf_gen.add_paragraph("Células existentes, mas sem perfil de usuário com a função 'líder' associado.")
+        pdf_gen.add_records_table(["Nome da Célula", "Líder Principal (no registro da célula)"], celulas_sem_lider_atribuido,
+                                  [('nome', 'text'), ('lider_principal_cadastrado_na_celula', 'text')],
+                                  "Nenhuma célula sem líder atribuído encontrada.")
     
-except Exception as e:
-    print(f"AVISO: Não foi possível registrar as fontes personalizadas. Usando Helvetica. Erro: {e}")
-    DEFAULT_FONT_NORMAL = 'Helvetica'
-    DEFAULT_FONT_BOLD = 'Helvetica-Bold'
-# --- Fim da Configuração da Fonte ---
-
-
-class PDFGenerator:
-    def __init__(self, buffer_obj):
-        self.buffer = buffer_obj
-        self.doc = SimpleDocTemplate(buffer_obj, pagesize=A4,
-                                     rightMargin=2 * cm, leftMargin=2 * cm,
-                                     topMargin=2 * cm, bottomMargin=2 * cm)
-        self.story = []
-        self.styles = getSampleStyleSheet()
-
-        # Configuração dos Estilos Personalizados (Refatoração 1.2)
-        # Aplica as fontes padrão configuradas e outros ajustes
-        
-        # Garante que os estilos básicos herdam a nova fonte padrão
-        self.styles['Normal'].fontName = DEFAULT_FONT_NORMAL
-        self.styles['Italic'].fontName = DEFAULT_FONT_NORMAL
-        self.styles['Bold'].fontName = DEFAULT_FONT_BOLD
-        self.styles['Code'].fontName = DEFAULT_FONT_NORMAL
-
-        self.styles['Title'].fontName = DEFAULT_FONT_BOLD
-        self.styles['Title'].fontSize = 18
-        self.styles['Title'].leading = 22
-        self.styles['Title'].alignment = TA_CENTER
-        self.styles['Title'].spaceAfter = 15
-        self.styles['Title'].textColor = colors.black
-
-        self.styles.add(ParagraphStyle(name='Celula_SectionHeading',
-                                       parent=self.styles['Normal'],
-                                       fontName=DEFAULT_FONT_BOLD,
-                                       fontSize=14,
-                                       leading=18,
-                                       spaceAfter=10,
-                                       textColor=colors.HexColor('#e67e22'))) # Laranja
-        
-        self.styles.add(ParagraphStyle(name='Celula_SubSectionHeading',
-                                       parent=self.styles['Normal'],
-                                       fontName=DEFAULT_FONT_BOLD,
-                                       fontSize=12,
-                                       leading=15,
-                                       spaceAfter=7,
-                                       textColor=colors.HexColor('#f39c12'))) # Laranja mais claro
-
-        self.styles.add(ParagraphStyle(name='Celula_NormalParagraph',
-                                       parent=self.styles['Normal'],
-                                       fontName=DEFAULT_FONT_NORMAL,
-                                       fontSize=10,
-                                       leading=12,
-                                       alignment=TA_LEFT,
-                                       textColor=colors.black))
-
-        self.styles.add(ParagraphStyle(name='Celula_SmallItalicText',
-                                       parent=self.styles['Normal'],
-                                       fontName=DEFAULT_FONT_NORMAL,
-                                       fontSize=9,
-                                       leading=11,
-                                       textColor=colors.HexColor('#666666')))
-
-        # Estilos para tabela
-        self.table_header_style = self.styles['Normal'].clone('table_header_style', 
-                                                              fontName=DEFAULT_FONT_BOLD, 
-                                                              fontSize=10, 
-                                                              alignment=TA_CENTER,
-                                                              textColor=colors.whitesmoke)
-        self.table_body_style = self.styles['Normal'].clone('table_body_style', 
-                                                            fontName=DEFAULT_FONT_NORMAL, 
-                                                            fontSize=9, 
-                                                            alignment=TA_LEFT,
-                                                            textColor=colors.black)
-
-
-    def add_title(self, text):
-        self.story.append(Paragraph(text, self.styles['Title']))
-        self.story.append(Spacer(1, 0.5 * cm))
-
-    def add_section_heading(self, text):
-        self.story.append(Paragraph(text, self.styles['Celula_SectionHeading']))
-        self.story.append(Spacer(1, 0.2 * cm))
-
-    def add_subsection_heading(self, text):
-        self.story.append(Paragraph(text, self.styles['Celula_SubSectionHeading']))
-        self.story.append(Spacer(1, 0.1 * cm))
-
-    def add_paragraph(self, text):
-        self.story.append(Paragraph(text, self.styles['Celula_NormalParagraph']))
-        self.story.append(Spacer(1, 0.1 * cm))
-
-    def add_small_italic_text(self, text):
-        self.story.append(Paragraph(f"<i>{text}</i>", self.styles['Celula_SmallItalicText']))
-        self.story.append(Spacer(1, 0.1 * cm))
-
-    def add_table(self, data, col_widths=None):
-        if not data or len(data) < 1:
-            self.add_small_italic_text("Nenhum dado para exibir na tabela.")
-            return
-
-        header_row = [Paragraph(format_nullable_data(cell), self.table_header_style) for cell in data[0]]
-        body_rows = []
-        for row in data[1:]:
-            body_rows.append([Paragraph(format_nullable_data(cell), self.table_body_style) for cell in row])
-
-        table_data = [header_row] + body_rows
-
-        num_cols = len(header_row)
-        page_width = A4[0] - self.doc.leftMargin - self.doc.rightMargin
-        if col_widths is None:
-            col_widths = [page_width / num_cols] * num_cols # Distribui igualmente se não houver largura definida
-        else:
-            total_given_width = sum(col_widths)
-            if total_given_width != page_width and total_given_width > 0:
-                col_widths = [cw * (page_width / total_given_width) for cw in col_widths]
-            if len(col_widths) < num_cols:
-                 # Adiciona larguras para colunas faltantes, distribuindo o restante
-                 remaining_width = page_width - sum(col_widths)
-                 if remaining_width < 0: remaining_width = 0 # Evita larguras negativas
-                 num_missing_cols = num_cols - len(col_widths)
-                 col_widths.extend([remaining_width / num_missing_cols] * num_missing_cols)
-            elif len(col_widths) > num_cols:
-                 col_widths = col_widths[:num_cols]
-
-
-        table_style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a627a')), # Azul escuro para o cabeçalho
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('LEFTPADDING', (0, 0), (-1, -1), 5),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),
-            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor('#999999')),
-        ])
-
-        # Adiciona fundo zebrado (alternado)
-        for i in range(1, len(table_data)):
-            if i % 2 == 0:
-                table_style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#eeeeee'))
-            else:
-                table_style.add('BACKGROUND', (0, i), (-1, i), colors.whitesmoke)
-        
-        # Ajusta alinhamento do corpo para a esquerda, se não foi definido pelo style do Paragraph
-        # Esta linha pode ser removida se o 'table_body_style' já for suficiente
-        table_style.add('ALIGN', (0, 1), (-1, -1), TA_LEFT) # Alinha o corpo à esquerda
+    elif report_type == "chaves_ativacao":
+        chaves_ativas = table_records(report_content, "chaves_ativas")
+        chaves_usadas = table_records(report_content, "chaves_usadas")
+        total_chaves = report_content["total_chaves"]
+
+        pdf_gen.add_paragraph(f"Total de Chaves de Ativação Registradas: {format_nullable_data(total_chaves)}")
+        pdf_gen.add_spacer()
+
+        pdf_gen.add_section_heading("Chaves Ativas:")
+        pdf_gen.add_records_table(["Chave", "Célula Associada"], chaves_ativas,
+                                  [('chave', 'text'), ('celula_nome', 'text')],
+                                  "Nenhuma chave de ativação ativa encontrada.")
+
+        pdf_gen.add_section_heading("Chaves Usadas:")
+        pdf_gen.add_records_table(["Chave", "Célula Original", "Usada Por (Email)", "Data de Uso"], chaves_usadas,
+                                  [('chave', 'text'), ('celula_nome', 'text'), ('usada_por_email', 'text'), ('data_uso', 'date')],
+                                  "Nenhuma chave de ativação usada encontrada.")
+    
+    else:
+        pdf_gen.add_paragraph("Tipo de relatório não reconhecido.")
+
+
+def render_pdf_bytes(report_type, report_title, report_content, theme=None, compact=None):
+    """Renderiza o relatório e retorna os bytes do PDF. Levanta exceção se a geração falhar."""
+    buffer = BytesIO()
+    pdf_gen = load_pdf_generator()(buffer, theme=theme, compact=compact)
+    render_report(pdf_gen, report_type, report_title, report_content)
+    if not pdf_gen.build_pdf():
+        raise RuntimeError(f"Falha ao gerar o PDF: {pdf_gen.build_error}")
+    return buffer.getvalue()
+
+
+def batch_response(json_data):
+    """Modo lote: {"batch": [payload, ...], "batch_output": "zip" | "pdf", "workers": n}."""
+    from .batch import BATCH_OUTPUTS, render_batch, build_zip, build_merged_pdf
+    payloads = json_data.get('batch')
+    output = json_data.get('batch_output', 'zip')
+    if not isinstance(payloads, list) or not payloads:
+        return Response(json.dumps({"error": "'batch' deve ser uma lista não vazia de relatórios"}),
+                        mimetype='application/json',
+                        status=400)
+    if output not in BATCH_OUTPUTS:
+        return Response(json.dumps({"error": f"'batch_output' deve ser um de: {', '.join(BATCH_OUTPUTS)}"}),
+                        mimetype='application/json',
+                        status=400)
+    try:
+        workers = int(json_data['workers']) if json_data.get('workers') is not None else None
+    except (TypeError, ValueError):
+        return Response(json.dumps({"error": "'workers' deve ser um número inteiro"}),
+                        mimetype='application/json',
+                        status=400)
+
+    results, report = render_batch(payloads, workers=workers, cache=pdf_cache)
+    failed = [job for job in report if not job['ok']]
+    if len(failed) == len(report):
+        return Response(json.dumps({"error": "Nenhum relatório do lote pôde ser gerado", "jobs": report}),
+                        mimetype='application/json',
+                        status=422)
+
+    headers = {'X-Batch-Total': str(len(report)), 'X-Batch-Failed': str(len(failed))}
+    if output == 'zip':
+        filename = json_data.get('filename', 'relatorios.zip')
+        body, mimetype = build_zip(results, report), 'application/zip'
+    else:
+        filename = json_data.get('filename', 'relatorios.pdf')
+        body, mimetype = build_merged_pdf(results), 'application/pdf'
+        # No PDF único os erros vão no cabeçalho (JSON em ASCII) em vez de num arquivo do ZIP
+        headers['X-Batch-Errors'] = json.dumps(failed)
+    headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return Response(body, mimetype=mimetype, headers=headers, status=200)
+
+
+def export_response(timer, export_format, report_type, report_title, report_content, filename):
+    """Exporta as seções do relatório como CSV/XLSX (ver exports.py), em streaming e sem o ReportLab."""
+    export = ReportExport()
+    with timer.stage('story'):
+        render_report(export, report_type, report_title, report_content)
+    mimetype, _ = EXPORT_FORMATS[export_format]
+    headers = {'Content-Disposition': f'attachment; filename="{export_filename(filename, export_format)}"',
+               'Server-Timing': timer.server_timing()}
+    writer = ChunkedResponseWriter()
+
+    def produce():
+        with timer.stage('export'):
+            yield from EXPORT_WRITERS[export_format](export, writer)
+
+    def on_complete(_):
+        timer.log(status=200, rows=export.row_count, bytes=writer.bytes_written)
+
+    return streaming_response(writer, produce, mimetype, headers=headers, on_complete=on_complete)
+
+
+def async_job_response(report_type, report_title, report_content, theme, compact, filename):
+    """Modo assíncrono ("async": true): enfileira o relatório e responde 202 com o id do job."""
+    from .jobs import JobQueueFull, submit_job
+    if isinstance(report_content, LazyObject):
+        report_content = report_content.to_dict()  # O job roda em outro processo
+    try:
+        job_id = submit_job(report_type, report_title, report_content, theme, compact, filename)
+    except JobQueueFull as e:
+        return Response(json.dumps({"error": str(e)}),
+                        mimetype='application/json',
+                        status=429,
+                        headers={'Retry-After': '5'})
+    return Response(json.dumps({"job_id": job_id, "status": "queued"}),
+                    mimetype='application/json',
+                    status=202)
+
+
+def job_response(request, job_id):
+    """GET ?job_id=<id>: status do job; com &download=1, o PDF gerado."""
+    from .jobs import get_job_store
+    store = get_job_store()
+    status = store.get(job_id)
+    if status is None:
+        return Response(json.dumps({"error": "Job não encontrado"}),
+                        mimetype='application/json',
+                        status=404)
+    if not request.args.get('download'):
+        return Response(json.dumps(status),
+                        mimetype='application/json',
+                        status=200)
 
-        t = Table(table_data, colWidths=col_widths)
-        t.setStyle(table_style)
-        self.story.append(t)
-        self.story.append(Spacer(1, 0.5 * cm))
+    result = store.open_result(job_id) if status.get('status') == 'done' else None
+    if result is None:
+        return Response(json.dumps({"error": "O PDF deste job ainda não está pronto", "status": status.get('status')}),
+                        mimetype='application/json',
+                        status=409)
+    headers = {'Content-Disposition': f'attachment; filename="{status.get("filename", "relatorio.pdf")}"'}
+    if status.get('bytes') is not None:
+        headers['Content-Length'] = str(status['bytes'])
+    return Response(wrap_file(request.environ, result),
+                    mimetype='application/pdf',
+                    headers=headers,
+                    status=200,
+                    direct_passthrough=True)
 
-    def build_pdf(self):
-        try:
-            self.doc.build(self.story)
-            return True
-        except Exception as e:
-            print(f"Erro ao gerar PDF: {e}")
-            return False
 
 # --- Vercel Serverless Function POST Handler ---
 # Esta função é o ponto de entrada real para a Serverless Function Python no Vercel.
@@ -212,10 +367,32 @@ def POST(request: Request):
     Vercel Serverless Function handler para requisições POST.
     Recebe um objeto `Request` do Werkzeug e retorna um `Response` do Werkzeug.
     """
+    timer = RequestTimer()
     try:
+        # Corpos grandes (ou com X-PDF-Ingest: stream) são lidos sob demanda: aqui
+        # só o começo do JSON é lido e as linhas das tabelas vão sendo lidas do
+        # corpo durante o doc.build (ver ingest.py). O restante da leitura entra
+        # então no tempo da etapa 'build'.
+        lazy_ingest = wants_streaming_ingest(request)
+
+        # Corpo comprimido (Content-Encoding: gzip ou zstd): descomprimido enquanto é lido
+        try:
+            body = request_body(request)
+        except UnsupportedEncoding as e:
+            return Response(json.dumps({"error": str(e)}),
+                            mimetype='application/json',
+                            status=415,
+                            headers={'Accept-Encoding': ', '.join(CONTENT_ENCODINGS)})
+        if body is not request.stream:
+            timer.set(encoding=request.headers.get('Content-Encoding'))
+
         # Tenta parsear o corpo da requisição como JSON
         try:
-            json_data = request.get_json()
+            with timer.stage('parse'):
+                if lazy_ingest:
+                    json_data = parse_streaming(body)
+                else:
+                    json_data = load_json(request, body)
         except Exception as e:
             print(f"Erro ao parsear JSON da requisição: {e}")
             return Response(json.dumps({"error": "Corpo da requisição inválido. Esperado JSON."}), 
@@ -227,226 +404,205 @@ def POST(request: Request):
                             mimetype='application/json', 
                             status=400)
 
+        if lazy_ingest:
+            # Procurar 'batch' leria o corpo inteiro: só procura se não houver 'type'
+            if json_data.get('type') is None and 'batch' in json_data:
+                return batch_response(json_data.to_dict())
+        elif 'batch' in json_data:
+            return batch_response(json_data)
+
         report_type = json_data.get('type')
         report_title = json_data.get('title')
         report_content = json_data.get('content')
         filename = json_data.get('filename', 'relatorio.pdf')
+        theme = json_data.get('theme') # Opcional: nome de um tema registrado em styles.py
+        stream = bool(json_data.get('stream', STREAM_RESPONSES)) # Opcional: resposta em streaming
+        profile = bool(json_data.get('profile')) and timer.start_profile() # Opcional: dump do cProfile
 
-        # CORREÇÃO AQUI: Garante que o tipo de relatório seja tratado consistentemente
-        if report_type == "faltosos_periodo":
-            report_type = "faltosos"
+        report_type = normalize_report_type(report_type)
+        timer.set(report_type=report_type, stream=stream, ingest='stream' if lazy_ingest else 'buffered')
 
         if not report_type or not report_title or not report_content:
             return Response(json.dumps({"error": "Faltando report_type, title ou content"}), 
                             mimetype='application/json', 
                             status=400)
 
-        buffer = BytesIO()
-        pdf_gen = PDFGenerator(buffer)
-
-        # --- Lógica de Geração de PDF (baseada no seu código original) ---
-        pdf_gen.add_title(report_title)
-
-        if report_type == "presenca_reuniao":
-            details = report_content["reuniao_detalhes"]
-            membros_presentes = report_content["membros_presentes"]
-            membros_ausentes = report_content["membros_ausentes"]
-            visitantes_presentes = report_content["visitantes_presentes"]
-
-            pdf_gen.add_subsection_heading("Detalhes da Reunião:")
-            pdf_gen.add_paragraph(f"Data: {format_date_for_pdf(details['data_reuniao'])}")
-            pdf_gen.add_paragraph(f"Tema: {format_nullable_data(details['tema'])}")
-            pdf_gen.add_paragraph(f"Ministrador 1: {format_nullable_data(details.get('ministrador_principal_nome'))}")
-            if details.get('ministrador_secundario_nome'):
-                pdf_gen.add_paragraph(f"Ministrador 2: {format_nullable_data(details['ministrador_secundario_nome'])}")
-            if details.get('responsavel_kids_nome'):
-                pdf_gen.add_paragraph(f"Responsável Kids: {format_nullable_data(details['responsavel_kids_nome'])}")
-            pdf_gen.add_paragraph(f"Crianças Presentes: {format_nullable_data(details.get('num_criancas', 0))}")
-            pdf_gen.story.append(Spacer(1, 0.5 * cm))
-
-            pdf_gen.add_section_heading("Membros Presentes")
-            if membros_presentes and len(membros_presentes) > 0:
-                data_membros_presentes_pdf = [["Nome", "Telefone"]] + \
-                                            [[format_nullable_data(m['nome']), format_phone_number_for_pdf(m['telefone'])] for m in membros_presentes]
-                pdf_gen.add_table(data_membros_presentes_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhum membro presente registrado.")
-
-            pdf_gen.add_section_heading("Membros Ausentes")
-            if membros_ausentes and len(membros_ausentes) > 0:
-                data_membros_ausentes_pdf = [["Nome", "Telefone"]] + \
-                                            [[format_nullable_data(m['nome']), format_phone_number_for_pdf(m['telefone'])] for m in membros_ausentes]
-                pdf_gen.add_table(data_membros_ausentes_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhum membro ausente registrado.")
-
-            pdf_gen.add_section_heading("Visitantes Presentes")
-            if visitantes_presentes and len(visitantes_presentes) > 0:
-                data_visitantes_presentes_pdf = [["Nome", "Telefone"]] + \
-                                                [[format_nullable_data(v['nome']), format_phone_number_for_pdf(v['telefone'])] for v in visitantes_presentes]
-                pdf_gen.add_table(data_visitantes_presentes_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhum visitante presente registrado.")
-
-        elif report_type == "presenca_membro":
-            membro_data = report_content["membro_data"]
-            historico_presenca = report_content["historico_presenca"]
-
-            pdf_gen.add_subsection_heading(f"Membro: {format_nullable_data(membro_data['nome'])}")
-            pdf_gen.add_paragraph(f"Telefone: {format_phone_number_for_pdf(membro_data['telefone'])}")
-            pdf_gen.add_paragraph(f"Data de Ingresso: {format_date_for_pdf(membro_data['data_ingresso'])}")
-            if membro_data.get('data_nascimento'):
-                pdf_gen.add_paragraph(f"Data de Nascimento: {format_date_for_pdf(membro_data['data_nascimento'])}")
-            pdf_gen.story.append(Spacer(1, 0.5 * cm))
-
-            pdf_gen.add_section_heading("Histórico de Presença:")
-            if historico_presenca and len(historico_presenca) > 0:
-                data_historico_pdf = [["Data da Reunião", "Tema", "Presente?"]] + \
-                                     [[format_date_for_pdf(h['data_reuniao']), format_nullable_data(h['tema']), "Sim" if h['presente'] else "Não"]
-                                      for h in historico_presenca] 
-                pdf_gen.add_table(data_historico_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhum histórico de presença encontrado para este membro.")
-
-        elif report_type == "faltosos":
-            faltosos = report_content["faltosos"]
-            start_date = report_content["start_date"]
-            end_date = report_content["end_date"]
-
-            pdf_gen.add_paragraph(f"Período: {format_date_for_pdf(start_date)} a {format_date_for_pdf(end_date)}")
-            pdf_gen.story.append(Spacer(1, 0.5 * cm))
-
-            pdf_gen.add_section_heading("Membros Faltosos:")
-            if faltosos and len(faltosos) > 0:
-                data_faltosos_pdf = [["Nome", "Telefone", "Presenças", "Reuniões no Período"]] + \
-                                    [[format_nullable_data(f['nome']), format_phone_number_for_pdf(f['telefone']), format_nullable_data(f['total_presencas']), format_nullable_data(f['total_reunioes_no_periodo'])]
-                                     for f in faltosos]
-                pdf_gen.add_table(data_faltosos_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhum membro com ausência registrado neste período.")
-
-        elif report_type == "visitantes_periodo":
-            visitantes = report_content["visitantes"]
-            start_date = report_content["start_date"]
-            end_date = report_content["end_date"]
-
-            pdf_gen.add_paragraph(f"Período: {format_date_for_pdf(start_date)} a {format_date_for_pdf(end_date)}")
-            pdf_gen.story.append(Spacer(1, 0.5 * cm))
-
-            pdf_gen.add_section_heading("Visitantes por Período:")
-            if visitantes and len(visitantes) > 0:
-                data_visitantes_pdf = [["Nome", "Telefone", "Primeira Visita"]] + \
-                                        [[format_nullable_data(v['nome']), format_phone_number_for_pdf(v['telefone']), format_date_for_pdf(v['data_primeira_visita'])]
-                                         for v in visitantes]
-                pdf_gen.add_table(data_visitantes_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhum visitante registrado neste período.")
-        
-        elif report_type == "aniversariantes_mes":
-            membros_aniversariantes = report_content["membros"]
-            visitantes_aniversariantes = report_content["visitantes"]
-            
-            pdf_gen.add_paragraph(f"Este relatório lista membros e visitantes que fazem aniversário no mês selecionado.")
-            pdf_gen.story.append(Spacer(1, 0.5 * cm))
-
-            pdf_gen.add_section_heading("Membros Aniversariantes:")
-            if membros_aniversariantes and len(membros_aniversariantes) > 0:
-                data_membros_aniversariantes_pdf = [["Nome", "Data Nasc.", "Telefone", "Célula"]] + \
-                                                   [[format_nullable_data(m['nome']), format_date_for_pdf(m['data_nascimento']), format_phone_number_for_pdf(m['telefone']), format_nullable_data(m['celula_nome'])]
-                                                    for m in membros_aniversariantes]
-                pdf_gen.add_table(data_membros_aniversariantes_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhum membro aniversariante neste mês.")
-
-            pdf_gen.add_section_heading("Visitantes Aniversariantes:")
-            if visitantes_aniversariantes and len(visitantes_aniversariantes) > 0:
-                data_visitantes_aniversariantes_pdf = [["Nome", "Data Nasc.", "Telefone", "Célula"]] + \
-                                                      [[format_nullable_data(v['nome']), format_date_for_pdf(v['data_nascimento']), format_phone_number_for_pdf(v['telefone']), format_nullable_data(v['celula_nome'])]
-                                                       for v in visitantes_aniversariantes]
-                pdf_gen.add_table(data_visitantes_aniversariantes_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhum visitante aniversariante neste mês.")
-        
-        elif report_type == "alocacao_lideres":
-            lideres_alocados = report_content["lideres_alocados"]
-            lideres_nao_alocados = report_content["lideres_nao_alocados"]
-            celulas_sem_lider_atribuido = report_content["celulas_sem_lider_atribuido"]
-            total_perfis_lider = report_content["total_perfis_lider"]
-            total_celulas = report_content["total_celulas"]
-
-            pdf_gen.add_paragraph(f"Total de Perfis de Líder/Admin: {format_nullable_data(total_perfis_lider)}")
-            pdf_gen.add_paragraph(f"Total de Células Registradas: {format_nullable_data(total_celulas)}")
-            pdf_gen.story.append(Spacer(1, 0.5 * cm))
-
-            pdf_gen.add_section_heading("Líderes Alocados em Células:")
-            if lideres_alocados and len(lideres_alocados) > 0:
-                data_alocados_pdf = [["Email", "Role", "Célula Associada", "Último Login"]] + \
-                                    [[format_nullable_data(l['email']), format_nullable_data(l['role']), format_nullable_data(l['celula_nome']), format_date_for_pdf(l['ultimo_login'])]
-                                     for l in lideres_alocados]
-                pdf_gen.add_table(data_alocados_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhum líder alocado em célula encontrado.")
-
-            pdf_gen.add_section_heading("Líderes sem Célula Alocada no Perfil:")
-            pdf_gen.add_paragraph("Usuários com a função 'líder' mas sem vínculo a uma célula no perfil.")
-            if lideres_nao_alocados and len(lideres_nao_alocados) > 0:
-                data_nao_alocados_pdf = [["Email", "Role", "Data Criação", "Último Login"]] + \
-                                        [[format_nullable_data(l['email']), format_nullable_data(l['role']), format_date_for_pdf(l['data_criacao_perfil']), format_date_for_pdf(l['ultimo_login'])]
-                                         for l in lideres_nao_alocados]
-                pdf_gen.add_table(data_nao_alocados_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhum líder sem célula alocada encontrado.")
-
-            pdf_gen.add_section_heading("Células sem Líder Atribuído em Perfis:")
-            pdf_gen.add_paragraph("Células existentes, mas sem perfil de usuário com a função 'líder' associado.")
-            if celulas_sem_lider_atribuido and len(celulas_sem_lider_atribuido) > 0:
-                data_celulas_sem_lider_pdf = [["Nome da Célula", "Líder Principal (no registro da célula)"]] + \
-                                             [[format_nullable_data(c['nome']), format_nullable_data(c['lider_principal_cadastrado_na_celula'])]
-                                              for c in celulas_sem_lider_atribuido]
-                pdf_gen.add_table(data_celulas_sem_lider_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhuma célula sem líder atribuído encontrada.")
-        
-        elif report_type == "chaves_ativacao":
-            chaves_ativas = report_content["chaves_ativas"]
-            chaves_usadas = report_content["chaves_usadas"]
-            total_chaves = report_content["total_chaves"]
-
-            pdf_gen.add_paragraph(f"Total de Chaves de Ativação Registradas: {format_nullable_data(total_chaves)}")
-            pdf_gen.story.append(Spacer(1, 0.5 * cm))
-
-            pdf_gen.add_section_heading("Chaves Ativas:")
-            if chaves_ativas and len(chaves_ativas) > 0:
-                data_ativas_pdf = [["Chave", "Célula Associada"]] + \
-                                  [[format_nullable_data(c['chave']), format_nullable_data(c['celula_nome'])]
-                                   for c in chaves_ativas]
-                pdf_gen.add_table(data_ativas_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhuma chave de ativação ativa encontrada.")
-
-            pdf_gen.add_section_heading("Chaves Usadas:")
-            if chaves_usadas and len(chaves_usadas) > 0:
-                data_usadas_pdf = [["Chave", "Célula Original", "Usada Por (Email)", "Data de Uso"]] + \
-                                  [[format_nullable_data(c['chave']), format_nullable_data(c['celula_nome']), format_nullable_data(c['usada_por_email']), format_date_for_pdf(c['data_uso'])]
-                                   for c in chaves_usadas]
-                pdf_gen.add_table(data_usadas_pdf)
-            else:
-                pdf_gen.add_small_italic_text("Nenhuma chave de ativação usada encontrada.")
-        
-        else:
-            pdf_gen.add_paragraph("Tipo de relatório não reconhecido.")
+        export_format = json_data.get('format') or 'pdf' # Opcional: 'csv' ou 'xlsx' (só os dados)
+        if export_format != 'pdf':
+            if export_format not in EXPORT_FORMATS:
+                return Response(json.dumps({"error": f"'format' deve ser um de: pdf, {', '.join(EXPORT_FORMATS)}"}),
+                                mimetype='application/json',
+                                status=400)
+            timer.set(format=export_format)
+            return export_response(timer, export_format, report_type, report_title, report_content, filename)
 
-        pdf_gen.build_pdf()
-        buffer.seek(0)
+        try:
+            compact = compact_level(json_data.get('compact')) # Opcional: PDF menor (ver compact.py)
+            preview = preview_options(json_data.get('preview')) # Opcional: só o começo (ver preview.py)
+            parallel = json_data.get('parallel', PARALLEL_RENDER) # Opcional: em partes (ver parallel.py)
+            if not isinstance(parallel, bool):
+                raise ValueError("'parallel' deve ser true ou false")
+        except ValueError as e:
+            return Response(json.dumps({"error": str(e)}),
+                            mimetype='application/json',
+                            status=400)
+        # A pré-visualização já é rápida e sempre sai de um só processo
+        parallel = parallel and not preview
+        timer.set(compact=compact, preview=preview, parallel=parallel)
+
+        # A pré-visualização é sempre síncrona: ela existe para responder rápido
+        if json_data.get('async') and not preview:
+            # Modo assíncrono: o relatório é renderizado em segundo plano (ver jobs.py)
+            response = async_job_response(report_type, report_title, report_content, theme, compact, filename)
+            timer.stop_profile(report_type)
+            timer.log(status=response.status_code)
+            return response
+
+        # Cache endereçado pelo conteúdo: a mesma chave serve de ETag, então um
+        # download repetido com If-None-Match nem chega a renderizar o PDF.
+        # Na ingestão em streaming o conteúdo só é conhecido depois do build, então
+        # não há chave de cache.
+        cache_key = None
+        if pdf_cache is not None and not lazy_ingest:
+            with timer.stage('cache'):
+                cache_key = make_cache_key(report_type, report_title, report_content, theme, compact, preview,
+                                           parallel)
+            etag = f'"{cache_key}"'
+            if request.if_none_match.contains(cache_key):
+                timer.log(status=304, cache='HIT')
+                return Response(status=304, headers={'ETag': etag, 'X-PDF-Cache': 'HIT',
+                                                     'Server-Timing': timer.server_timing()})
+
+        with timer.stage('cache'):
+            pdf_bytes = pdf_cache.get(cache_key) if cache_key else None
+        cache_status = 'HIT' if pdf_bytes is not None else 'MISS'
+        timer.set(cache=cache_status if cache_key else None)
+
+        headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+        if cache_key:
+            headers['ETag'] = etag
+            headers['X-PDF-Cache'] = cache_status
+            headers['Cache-Control'] = 'private, no-cache'
+        if preview:
+            headers['X-PDF-Preview'] = f"pages={preview['pages']}, rows={preview['rows']}"
+
+        # A pré-visualização não sai em streaming: ela é curta e, se o tempo a
+        # cortar, os cabeçalhos de cache precisam mudar depois do build.
+        if pdf_bytes is None and stream and not profile and not preview:
+            # Modo streaming: a story e a primeira página são diagramadas agora
+            # (um erro até aí vira 500), o restante do doc.build roda quando o
+            # servidor começa a ler o corpo da resposta, e o PDF é entregue em
+            # pedaços direto do que o ReportLab escreveu. Um erro numa página
+            # seguinte interrompe a resposta (sem o fim do chunked), então o
+            # cliente nunca recebe um PDF incompleto como se fosse válido.
+            # O Server-Timing só traz as etapas até a primeira página; o resto vai no log.
+            writer = ChunkedResponseWriter(keep=cache_key is not None)
+            with timer.stage('load'):
+                PDFGenerator = load_pdf_generator(parallel)
+            pdf_gen = PDFGenerator(writer, theme=theme, compact=compact, preview=preview)
+            with timer.stage('story'):
+                render_report(pdf_gen, report_type, report_title, report_content)
+            pages = pdf_gen.iter_build()
+            try:
+                with timer.stage('first_page'):
+                    next(pages, None)
+            except Exception as e:
+                timer.log(status=500, error=str(e))
+                return Response(json.dumps({"error": f"Erro ao gerar o PDF: {e}"}),
+                                mimetype='application/json',
+                                status=500,
+                                headers={'Server-Timing': timer.server_timing()})
+            headers['Server-Timing'] = timer.server_timing()
+
+            def build():
+                try:
+                    with timer.stage('build'):
+                        yield from pages
+                except Exception as e:
+                    timer.log(status=500, error=str(e), rows=pdf_gen.row_count,
+                              pages=pdf_gen.page_count, bytes=writer.bytes_written)
+                    raise
+
+            def on_complete(_):
+                if cache_key:
+                    pdf_cache.put(cache_key, writer.getvalue())
+                timer.log(status=200, rows=pdf_gen.row_count,
+                          pages=pdf_gen.page_count, bytes=writer.bytes_written)
+
+            return streaming_response(writer, build, 'application/pdf',
+                                      headers=headers, on_complete=on_complete)
+
+        if pdf_bytes is None:
+            buffer = BytesIO()
+            with timer.stage('load'):
+                PDFGenerator = load_pdf_generator(parallel)
+            pdf_gen = PDFGenerator(buffer, theme=theme, compact=compact, preview=preview)
+            with timer.stage('story'):
+                render_report(pdf_gen, report_type, report_title, report_content)
+            with timer.stage('build'):
+                built = pdf_gen.build_pdf()
+            timer.set(rows=pdf_gen.row_count, pages=pdf_gen.page_count)
+            if parallel:
+                timer.set(parts=pdf_gen.part_count)
+            if not built:
+                timer.stop_profile(report_type)
+                timer.log(status=500, error=str(pdf_gen.build_error))
+                return Response(json.dumps({"error": f"Erro ao gerar o PDF: {pdf_gen.build_error}"}),
+                                mimetype='application/json',
+                                status=500,
+                                headers={'Server-Timing': timer.server_timing()})
+            with timer.stage('copy'):
+                pdf_bytes = buffer.getvalue()
+            if preview and pdf_gen.doc.timed_out:
+                # Cortada pelo orçamento de tempo: o mesmo payload pode chegar a
+                # mais páginas noutra vez, então nem cache nem ETag.
+                cache_key = None
+                headers.pop('ETag', None)
+                headers.pop('X-PDF-Cache', None)
+                headers['Cache-Control'] = 'no-store'
+                headers['X-PDF-Preview'] += ', truncated=deadline'
+                timer.set(cache=None, preview_timed_out=True)
+            if cache_key:
+                pdf_cache.put(cache_key, pdf_bytes)
+
+        if profile:
+            profile_path = timer.stop_profile(report_type)
+            if profile_path:
+                headers['X-PDF-Profile'] = profile_path
+
+        headers['Server-Timing'] = timer.server_timing()
+        timer.log(status=200, bytes=len(pdf_bytes))
 
         # Retorna o Response do Werkzeug com o PDF gerado
-        return Response(buffer.getvalue(), 
+        return Response(pdf_bytes, 
                         mimetype='application/pdf', 
-                        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+                        headers=headers,
                         status=200)
 
     except Exception as e:
         print(f"Erro no serviço Python (POST handler): {e}")
+        timer.stop_profile('erro')
+        timer.log(status=500, error=str(e))
         return Response(json.dumps({"error": f"Erro interno do servidor Python: {str(e)}"}), 
                         mimetype='application/json', 
-                        status=500)
\ No newline at end of file
+                        status=500)
+    finally:
+        # Os retornos antecipados (400, 304, exportações...) não param o profiler;
+        # ativo, ele continuaria medindo as próximas requisições desta thread.
+        timer.cancel_profile()
+
+
+def GET(request: Request):
+    """Estatísticas do serviço (cache de PDFs e fila de jobs) ou, com ?job_id=, um job assíncrono."""
+    job_id = request.args.get('job_id')
+    if job_id:
+        return job_response(request, job_id)
+    from .jobs import get_job_stats
+    return Response(json.dumps({"cache": get_cache_stats(), "jobs": get_job_stats()}),
+                    mimetype='application/json',
+                    status=200)
+
+
+if not FAST_START:
+    load_pdf_generator()
+mark_import(_IMPORT_STARTED)
@@ -0,0 +1,492 @@
+# src/app/api/python_pdf_generator/server.py
+"""Servidor de longa duração para hospedar o serviço fora da Vercel.
+
+O processo principal importa o serviço, o ReportLab, as fontes e os estilos de
+todos os temas (como o _warm_worker do modo lote) e só então cria os workers
+com fork: essa memória fica compartilhada entre eles (copy-on-write) e nenhum
+worker paga o cold start. Todos aceitam conexões no mesmo socket; cada um é um
+servidor Werkzeug com threads que encaminha POST e GET para os handlers de
+route.py, com keep-alive (HTTP/1.1).
+
+Limites:
+- cada worker renderiza no máximo PDF_SERVER_CONCURRENCY requisições ao mesmo
+  tempo; um worker sem vaga não aceita novas conexões enquanto outro tiver;
+- quando todos estão ocupados, até PDF_SERVER_QUEUE requisições (somando todos
+  os workers) esperam por uma vaga; acima disso a resposta é 503 com Retry-After;
+- depois de PDF_SERVER_MAX_REQUESTS requisições (mais um sorteio de até
+  PDF_SERVER_MAX_REQUESTS_JITTER, para que não reciclem todos juntos) o worker
+  para de aceitar conexões, termina as que estão abertas e é substituído por um
+  novo, o que contém o crescimento de memória (fragmentação, caches).
+
+GET /healthz responde sem passar pelos limites, com a ocupação do servidor.
+
+Uso (a partir de src/app/api):
+
+    python -m python_pdf_generator.server --port 8000 --workers 4
+
+e, no Next.js, PYTHON_PDF_SERVICE_URL=http://127.0.0.1:8000/api/python_pdf_generator
+(qualquer caminho diferente de /healthz vai para o serviço).
+
+SIGTERM/SIGINT encerram o servidor esperando as requisições em andamento;
+SIGHUP recicla todos os workers.
+"""
+import argparse
+import gc
+import io
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+from werkzeug.wrappers import Request, Response
+
+SERVER_HOST = os.environ.get('PDF_SERVER_HOST', '127.0.0.1')
+SERVER_PORT = int(os.environ.get('PDF_SERVER_PORT', '8000'))
+SERVER_WORKERS = max(1, int(os.environ.get('PDF_SERVER_WORKERS', os.cpu_count() or 1)))
+# Renderizações simultâneas por worker (o ReportLab usa CPU e disputa o GIL entre threads)
+SERVER_CONCURRENCY = max(1, int(os.environ.get('PDF_SERVER_CONCURRENCY', '1')))
+SERVER_QUEUE = int(os.environ.get('PDF_SERVER_QUEUE', SERVER_WORKERS * 4))
+SERVER_BACKLOG = int(os.environ.get('PDF_SERVER_BACKLOG', '128'))
+SERVER_KEEPALIVE = float(os.environ.get('PDF_SERVER_KEEPALIVE', '5'))  # Segundos de conexão ociosa
+SERVER_MAX_REQUESTS = int(os.environ.get('PDF_SERVER_MAX_REQUESTS', '1000'))  # 0 = nunca recicla
+SERVER_MAX_REQUESTS_JITTER = int(os.environ.get('PDF_SERVER_MAX_REQUESTS_JITTER', '50'))
+SERVER_GRACEFUL_TIMEOUT = float(os.environ.get('PDF_SERVER_GRACEFUL_TIMEOUT', '30'))
+
+# Até quanto do corpo de uma requisição não lido pelo handler (um erro 400, um
+# 503) é descartado para manter a conexão aberta; acima disso ela é fechada.
+MAX_DISCARDED_BODY = 1024 * 1024
+CONNECTION_KEY = 'pdf_server.connection'
+
+# Intervalo com que um worker sem vaga confere se os outros ainda têm
+ACCEPT_POLL = 0.01
+MASTER_POLL = 0.5
+
+
+def preload():
+    """Carrega no processo principal tudo o que os workers vão compartilhar."""
+    from . import route
+    from .batch import _warm_worker
+    route.load_pdf_generator()
+    _warm_worker()
+    # Objetos já criados não são mais visitados pelo coletor, que do contrário
+    # tocaria (e copiaria) as páginas compartilhadas em cada worker.
+    gc.freeze()
+    return route
+
+
+class ServerState:
+    """Contadores compartilhados (memória anônima herdada no fork) por todos os workers."""
+
+    def __init__(self, workers, concurrency, max_queued):
+        self.workers = workers
+        self.concurrency = concurrency
+        self.capacity = workers * concurrency
+        self.max_queued = max_queued
+        self.active = multiprocessing.Value('i', 0)
+        self.queued = multiprocessing.Value('i', 0)
+        self.served = multiprocessing.Value('l', 0)
+        self.recycled = multiprocessing.Value('i', 0)
+
+    def add(self, counter, amount):
+        with counter.get_lock():
+            counter.value += amount
+
+    def try_enqueue(self):
+        with self.queued.get_lock():
+            if self.queued.value >= self.max_queued:
+                return False
+            self.queued.value += 1
+            return True
+
+    def stats(self):
+        return {'workers': self.workers, 'concurrency': self.concurrency, 'capacity': self.capacity,
+                'active': self.active.value, 'queued': self.queued.value,
+                'max_queued': self.max_queued, 'served': self.served.value,
+                'recycled': self.recycled.value}
+
+
+class _NoInput:
+    def read(self, size=-1):
+        return b''
+
+
+_NO_INPUT = _NoInput()
+
+
+class _CountingInput(io.RawIOBase):
+    """wsgi.input que conta os bytes lidos do corpo da requisição."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.bytes_read = 0
+        self.eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        size = self._stream.readinto(b)
+        if size:
+            self.bytes_read += size
+        elif len(b):
+            self.eof = True
+        return size
+
+
+def _discard_body(stream, limit=MAX_DISCARDED_BODY):
+    """Lê e descarta o resto do corpo da requisição; False se não der (erro ou corpo grande demais)."""
+    try:
+        while limit > 0:
+            chunk = stream.read(min(limit, 64 * 1024))
+            if not chunk:
+                return True
+            limit -= len(chunk)
+        return not stream.read(1)
+    except Exception:
+        return False
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    # HTTP/1.1: keep-alive e respostas chunked; `timeout` fecha conexões ociosas
+    protocol_version = 'HTTP/1.1'
+    timeout = SERVER_KEEPALIVE
+
+    # O Werkzeug fecha toda conexão depois da resposta e, antes disso, lê e
+    # descarta o que ainda houver no socket, porque não sabe se o corpo da
+    # requisição foi lido até o fim. Aqui o Worker lê o resto do corpo ao final
+    # da resposta (keep_body_read) e só então a conexão continua aberta. O
+    # "Connection: close" só é omitido se, quando os cabeçalhos saem, o que
+    # falta do corpo couber em MAX_DISCARDED_BODY; senão a resposta avisa o
+    # cliente de que a conexão será fechada.
+
+    def make_environ(self):
+        environ = super().make_environ()
+        self.request_input = environ['wsgi.input'] = _CountingInput(environ['wsgi.input'])
+        environ[CONNECTION_KEY] = self
+        return environ
+
+    def unread_body(self):
+        """Bytes do corpo da requisição ainda não lidos; None se não der para saber (chunked)."""
+        environ = self.environ
+        length = environ.get('CONTENT_LENGTH', '')
+        if length.isdigit():
+            return max(0, int(length) - self.request_input.bytes_read)
+        if environ.get('wsgi.input_terminated'):
+            return 0 if self.request_input.eof else None
+        return 0
+
+    def run_wsgi(self):
+        self.keep_alive = False
+        rfile = self.rfile
+        try:
+            super().run_wsgi()
+        finally:
+            self.rfile = rfile
+        if not self.keep_alive:
+            self.close_connection = True
+
+    def keep_body_read(self):
+        """Chamado depois que o resto do corpo foi descartado: a conexão pode ser reaproveitada."""
+        self.keep_alive = True
+        self.rfile = _NO_INPUT  # A próxima requisição não pode ser descartada pelo Werkzeug
+
+    def send_header(self, keyword, value):
+        if keyword == 'Connection' and value == 'close' and not self.server.stopping:
+            unread = self.unread_body()
+            if unread is not None and unread <= MAX_DISCARDED_BODY:
+                return
+        super().send_header(keyword, value)
+
+    def setup(self):
+        super().setup()
+        self.server.connection_opened()
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            self.server.connection_closed()
+
+    def log_request(self, code='-', size='-'):
+        pass  # Cada requisição já gera a sua linha de log JSON (ver timing.py)
+
+    def log_error(self, format, *args):
+        if format.startswith('Request timed out'):
+            return  # Conexão keep-alive ociosa fechada após o timeout: esperado
+        super().log_error(format, *args)
+
+
+class Worker(ThreadedWSGIServer):
+    """Um processo do servidor: atende as conexões que aceitar do socket compartilhado."""
+
+    def __init__(self, listener, route, state, max_requests):
+        self.route = route
+        self.state = state
+        self.max_requests = max_requests
+        self.requests = 0
+        self.stopping = False
+        self._slots = threading.BoundedSemaphore(state.concurrency)
+        self._busy = 0  # Vagas ocupadas neste worker
+        self._connections = 0
+        self._lock = threading.Lock()
+        host, port = listener.getsockname()[:2]
+        super().__init__(host, port, self.wsgi_app, handler=KeepAliveRequestHandler, fd=listener.fileno())
+        # O socket é compartilhado: outro worker pode aceitar a conexão antes
+        # deste, e o accept não pode bloquear o laço do serve_forever.
+        self.socket.setblocking(False)
+
+    def connection_opened(self):
+        with self._lock:
+            self._connections += 1
+
+    def connection_closed(self):
+        with self._lock:
+            self._connections -= 1
+
+    def service_actions(self):
+        # Chamado a cada volta do serve_forever, antes de aceitar a próxima
+        # conexão: sem vaga aqui, deixa a conexão para um worker que tenha.
+        while (not self.stopping and self._busy >= self.state.concurrency
+               and self.state.active.value < self.state.capacity):
+            time.sleep(ACCEPT_POLL)
+
+    def acquire_slot(self):
+        """Ocupa uma vaga de renderização, esperando na fila se preciso. False se a fila estiver cheia."""
+        if not self._slots.acquire(blocking=False):
+            if not self.state.try_enqueue():
+                return False
+            try:
+                self._slots.acquire()
+            finally:
+                self.state.add(self.state.queued, -1)
+        with self._lock:
+            self._busy += 1
+        self.state.add(self.state.active, 1)
+        return True
+
+    def release_slot(self):
+        self.state.add(self.state.active, -1)
+        with self._lock:
+            self._busy -= 1
+        self._slots.release()
+
+    def request_finished(self):
+        self.state.add(self.state.served, 1)
+        with self._lock:
+            self.requests += 1
+            recycle = self.max_requests and self.requests >= self.max_requests and not self.stopping
+        if recycle:
+            print(f"Worker {os.getpid()}: {self.requests} requisições atendidas, reciclando")
+            self.state.add(self.state.recycled, 1)
+            self.stop()
+
+    def stop(self):
+        """Para de aceitar conexões; as abertas são terminadas em drain()."""
+        if self.stopping:
+            return
+        self.stopping = True
+        # shutdown() espera o serve_forever sair, então não pode rodar na thread dele
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def wsgi_app(self, environ, start_response):
+        """Encaminha para route.POST/GET; só os POSTs (que renderizam) ocupam vagas."""
+        request = Request(environ)
+        release = None
+        if request.path.rstrip('/') == '/healthz':
+            handler = self._healthz
+        elif request.method == 'POST':
+            if self.acquire_slot():
+                handler, release = self.route.POST, self.release_slot
+            else:
+                handler = self._busy_response
+        elif request.method == 'GET':
+            handler = self.route.GET
+        else:
+            handler = self._method_not_allowed
+
+        if handler is not self.route.POST:
+            # Estes não leem o corpo: descartado já, antes dos cabeçalhos (ver send_header)
+            _discard_body(request.stream)
+        try:
+            response = handler(request)
+            body = response(environ, start_response)
+        except BaseException:
+            self._finish_request(handler, release)
+            raise
+        return self._respond(body, request, environ[CONNECTION_KEY], handler, release)
+
+    def _respond(self, body, request, connection, handler, release):
+        # A vaga só é liberada depois que o corpo da resposta (que pode ser
+        # renderizado em streaming) for enviado.
+        try:
+            yield from body
+            # O que sobrar do corpo da requisição precisa ser lido antes da
+            # próxima requisição na mesma conexão (keep-alive)
+            if _discard_body(request.stream):
+                connection.keep_body_read()
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+            self._finish_request(handler, release)
+
+    def _finish_request(self, handler, release):
+        if release is not None:
+            release()
+        if handler is self.route.POST or handler is self.route.GET:
+            self.request_finished()
+
+    def _healthz(self, request):
+        return Response(json.dumps({'status': 'ok', 'pid': os.getpid(), **self.state.stats()}),
+                        mimetype='application/json')
+
+    def _busy_response(self, request):
+        return Response(json.dumps({"error": "Servidor ocupado; tente novamente."}),
+                        mimetype='application/json',
+                        status=503,
+                        headers={'Retry-After': '1'})
+
+    def _method_not_allowed(self, request):
+        return Response(json.dumps({"error": "Método não permitido"}),
+                        mimetype='application/json',
+                        status=405,
+                        headers={'Allow': 'GET, POST'})
+
+    def drain(self, timeout=SERVER_GRACEFUL_TIMEOUT):
+        """Espera as conexões abertas (ociosas fecham após o keep-alive) até `timeout` segundos."""
+        deadline = time.monotonic() + timeout
+        while self._connections > 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+
+def run_worker(listener, route, state, max_requests):
+    """Corpo do processo filho; não retorna."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # O Ctrl+C chega ao processo principal
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    random.seed()  # Sem isso todos os workers herdariam o mesmo sorteio
+    if max_requests:
+        max_requests += random.randint(0, SERVER_MAX_REQUESTS_JITTER)
+    worker = Worker(listener, route, state, max_requests)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    status = 0
+    try:
+        worker.serve_forever()
+        worker.drain()
+    except BaseException as e:
+        print(f"Erro no worker {os.getpid()}: {e}")
+        status = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(status)
+
+
+def serve(host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS, concurrency=SERVER_CONCURRENCY,
+          max_queued=SERVER_QUEUE, max_requests=SERVER_MAX_REQUESTS):
+    started = time.perf_counter()
+    route = preload()
+    listener = socket.create_server((host, port), backlog=SERVER_BACKLOG)
+    state = ServerState(workers, concurrency, max_queued)
+    children = set()
+    stopping = False
+    recycle_all = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            run_worker(listener, route, state, max_requests)
+        children.add(pid)
+
+    def on_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    def on_hup(signum, frame):
+        nonlocal recycle_all
+        recycle_all = True
+
+    signal.signal(signal.SIGTERM, on_stop)
+    signal.signal(signal.SIGINT, on_stop)
+    signal.signal(signal.SIGHUP, on_hup)
+
+    for _ in range(workers):
+        spawn()
+    print(f"Servidor de PDFs em http://{host}:{listener.getsockname()[1]} "
+          f"({workers} workers x {concurrency}, fila {max_queued}, "
+          f"pronto em {(time.perf_counter() - started) * 1000:.0f} ms)")
+    sys.stdout.flush()
+
+    while not stopping:
+        if recycle_all:
+            recycle_all = False
+            # Os novos já aceitam conexões enquanto os antigos terminam as suas
+            old = set(children)
+            for _ in range(workers):
+                spawn()
+            for pid in old:
+                _signal_worker(pid, signal.SIGTERM)
+            children.difference_update(old)
+        _reap(children, on_exit=None if stopping else lambda pid: spawn())
+        time.sleep(MASTER_POLL)
+
+    for pid in children:
+        _signal_worker(pid, signal.SIGTERM)
+    deadline = time.monotonic() + SERVER_GRACEFUL_TIMEOUT + 1
+    while children and time.monotonic() < deadline:
+        _reap(children)
+        time.sleep(0.05)
+    for pid in children:
+        _signal_worker(pid, signal.SIGKILL)
+    listener.close()
+    print("Servidor de PDFs encerrado")
+    return 0
+
+
+def _signal_worker(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def _reap(children, on_exit=None):
+    """Recolhe os workers que terminaram (e os reciclados com SIGHUP, fora de `children`)."""
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        if pid not in children:
+            continue
+        children.discard(pid)
+        code = os.waitstatus_to_exitcode(status)
+        if code != 0:
+            print(f"Worker {pid} terminou com código {code}")
+        if on_exit is not None:
+            on_exit(pid)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor do gerador de PDFs (pré-fork)")
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS, help="processos")
+    parser.add_argument('--concurrency', type=int, default=SERVER_CONCURRENCY,
+                        help="renderizações simultâneas por worker")
+    parser.add_argument('--queue', type=int, default=SERVER_QUEUE,
+                        help="requisições esperando vaga (todos os workers) antes do 503")
+    parser.add_argument('--max-requests', type=int, default=SERVER_MAX_REQUESTS,
+                        help="requisições até reciclar um worker (0 = nunca)")
+    args = parser.parse_args(argv)
+    return serve(args.host, args.port, max(1, args.workers), max(1, args.concurrency),
+                 max(0, args.queue), max(0, args.max_requests))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# src/app/api/python_pdf_generator/story.py
+"""Story preenchida sob demanda durante o doc.build.
+
+O doc.build do ReportLab consome a story como uma lista: olha os primeiros
+itens, remove o que já foi diagramado e devolve à frente as partes de um
+flowable quebrado entre páginas. A LazyStory se comporta assim, mas os itens
+acrescentados com defer() são geradores de flowables que só rodam quando a
+diagramação chega neles, e apenas STORY_LOOKAHEAD flowables ficam prontos à
+frente do que está sendo diagramado. Com isso os Paragraphs das tabelas (e a
+formatação das linhas) de uma seção só existem enquanto ela está sendo
+diagramada, e o que já foi desenhado é liberado.
+"""
+import os
+from collections import deque
+
+# Flowables mantidos prontos à frente da diagramação (o keepWithNext do
+# ReportLab precisa enxergar alguns itens adiante).
+STORY_LOOKAHEAD = int(os.environ.get('PDF_STORY_LOOKAHEAD', '16'))
+
+
+class LazyStory(list):
+    """Lista de flowables que se reabastece, na ordem, a partir de itens e geradores pendentes."""
+
+    def __init__(self, lookahead=STORY_LOOKAHEAD):
+        super().__init__()
+        self._lookahead = max(1, lookahead)
+        self._pending = deque()  # Flowables ou iteradores de flowables, na ordem da story
+        self._closed = False
+
+    def append(self, flowable):
+        self._pending.append(flowable)
+
+    def extend(self, flowables):
+        self._pending.extend(flowables)
+
+    def defer(self, flowables):
+        """Acrescenta um iterável de flowables que só será percorrido durante o doc.build."""
+        self._pending.append(iter(flowables))
+
+    def close(self):
+        """Descarta o que falta da story: o doc.build termina na página atual (ver preview.py)."""
+        self._pending.clear()
+        list.clear(self)
+        self._closed = True
+
+    def _refill(self, count):
+        pending = self._pending
+        while pending and list.__len__(self) < count:
+            item = pending[0]
+            if hasattr(item, '__next__'):
+                try:
+                    list.append(self, next(item))
+                except StopIteration:
+                    pending.popleft()
+            else:
+                pending.popleft()
+                list.append(self, item)
+
+    def __len__(self):
+        if self._closed:
+            # O doc.build devolve à story o flowable que não coube na página
+            return 0
+        self._refill(self._lookahead)
+        return list.__len__(self)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            stop = index.stop
+            self._refill(stop if stop is not None and stop >= 0 else float('inf'))
+        else:
+            self._refill(index + 1 if index >= 0 else float('inf'))
+        return list.__getitem__(self, index)
+
+    def __iter__(self):
+        # Percorrer a story inteira (fora do doc.build) gera todos os flowables
+        self._refill(float('inf'))
+        return list.__iter__(self)
@@ -0,0 +1,86 @@
+# src/app/api/python_pdf_generator/streaming.py
+"""Resposta em streaming para os arquivos gerados.
+
+Em vez de renderizar num BytesIO e copiar tudo com getvalue(), o gerador escreve
+num ChunkedResponseWriter (um objeto "file-like") e o corpo da resposta é um
+iterador que entrega o que foi escrito em pedaços de tamanho fixo. A renderização
+só acontece quando o servidor começa a consumir o corpo da resposta.
+"""
+from collections import deque
+
+from werkzeug.wrappers import Response
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ChunkedResponseWriter:
+    """Destino de escrita que guarda referências (memoryview) ao que foi escrito,
+    sem copiar, e as devolve em pedaços de no máximo `chunk_size` bytes.
+
+    Com `keep=True` os blocos escritos continuam disponíveis em `getvalue()`
+    depois de drenados (usado para alimentar o cache)."""
+
+    def __init__(self, chunk_size=STREAM_CHUNK_SIZE, keep=False):
+        self.chunk_size = chunk_size
+        self.bytes_written = 0
+        self._pending = deque()
+        self._kept = [] if keep else None
+
+    def write(self, data):
+        if not data:
+            return 0
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if self._kept is not None:
+            self._kept.append(data)
+        view = memoryview(data)
+        for start in range(0, len(view), self.chunk_size):
+            self._pending.append(view[start:start + self.chunk_size])
+        self.bytes_written += len(view)
+        return len(view)
+
+    def flush(self):
+        pass
+
+    def tell(self):
+        return self.bytes_written
+
+    def drain(self):
+        """Entrega (e esquece) os pedaços escritos até agora."""
+        pending = self._pending
+        while pending:
+            yield bytes(pending.popleft())
+
+    def getvalue(self):
+        if self._kept is None:
+            raise ValueError("ChunkedResponseWriter criado sem keep=True")
+        if len(self._kept) == 1:
+            return bytes(self._kept[0])
+        return b''.join(self._kept)
+
+
+def streaming_response(writer, produce, mimetype, headers=None, on_complete=None):
+    """Cria uma Response cujo corpo é gerado sob demanda.
+
+    `produce()` escreve o arquivo em `writer`. Pode ser uma função comum ou um
+    gerador, que é consumido entre uma escrita e outra para ir liberando os
+    pedaços já prontos. `on_complete(result)` recebe o retorno de `produce` (ou
+    None, se for um gerador) quando a geração termina sem erro. Como os cabeçalhos
+    já terão sido enviados, um erro durante a geração apenas interrompe a
+    resposta; a validação da entrada deve acontecer antes.
+    """
+    def body():
+        try:
+            result = produce()
+            if hasattr(result, '__next__'):
+                for _ in result:
+                    yield from writer.drain()
+                result = None
+            yield from writer.drain()
+        except Exception as e:
+            print(f"Erro ao gerar arquivo em streaming: {e}")
+            raise
+        if on_complete is not None:
+            on_complete(result)
+
+    return Response(body(), mimetype=mimetype, headers=headers, direct_passthrough=True)
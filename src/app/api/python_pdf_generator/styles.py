@@ -0,0 +1,180 @@
+# src/app/api/python_pdf_generator/styles.py
+"""Registro de temas e folhas de estilo compartilhadas pelo PDFGenerator.
+
+As folhas de estilo são montadas uma única vez por processo (por tema e par de
+fontes) e reaproveitadas por todos os geradores. Os objetos retornados são
+compartilhados: não devem ser alterados por quem os utiliza.
+"""
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import TableStyle
+
+DEFAULT_THEME = 'padrao'
+
+
+@dataclass(frozen=True)
+class Theme:
+    """Paleta de cores de um relatório. Imutável para poder ser compartilhada."""
+    name: str
+    section_heading_color: object
+    subsection_heading_color: object
+    muted_text_color: object
+    table_header_background: object
+    table_header_text_color: object
+    table_grid_color: object
+    table_box_color: object
+    table_row_backgrounds: tuple  # Cores alternadas (zebra) das linhas do corpo
+
+
+_THEMES = {}
+_REGISTRIES = {}
+_LOCK = threading.Lock()
+
+
+def register_theme(theme):
+    """Registra (ou substitui) um tema. O custo de montar seus estilos só é pago
+    uma vez, na primeira requisição que usar o tema."""
+    with _LOCK:
+        _THEMES[theme.name] = theme
+        for key in [k for k in _REGISTRIES if k[0] == theme.name]:
+            del _REGISTRIES[key]
+    return theme
+
+
+def get_theme(name=None):
+    """Retorna o tema pelo nome, ou o tema padrão se o nome for desconhecido."""
+    return _THEMES.get(name or DEFAULT_THEME) or _THEMES[DEFAULT_THEME]
+
+
+def available_themes():
+    return tuple(_THEMES)
+
+
+register_theme(Theme(name=DEFAULT_THEME,
+                     section_heading_color=colors.HexColor('#e67e22'),     # Laranja
+                     subsection_heading_color=colors.HexColor('#f39c12'),  # Laranja mais claro
+                     muted_text_color=colors.HexColor('#666666'),
+                     table_header_background=colors.HexColor('#4a627a'),   # Azul escuro para o cabeçalho
+                     table_header_text_color=colors.whitesmoke,
+                     table_grid_color=colors.HexColor('#cccccc'),
+                     table_box_color=colors.HexColor('#999999'),
+                     table_row_backgrounds=(colors.whitesmoke, colors.HexColor('#eeeeee'))))
+
+# Tema em tons de cinza, para relatórios que serão impressos.
+register_theme(Theme(name='impressao',
+                     section_heading_color=colors.HexColor('#222222'),
+                     subsection_heading_color=colors.HexColor('#444444'),
+                     muted_text_color=colors.HexColor('#666666'),
+                     table_header_background=colors.HexColor('#555555'),
+                     table_header_text_color=colors.white,
+                     table_grid_color=colors.HexColor('#bbbbbb'),
+                     table_box_color=colors.HexColor('#777777'),
+                     table_row_backgrounds=(colors.white, colors.HexColor('#f2f2f2'))))
+
+
+class StyleRegistry:
+    """Conjunto imutável de estilos de parágrafo e de tabela de um tema."""
+
+    def __init__(self, theme, font_normal, font_bold):
+        self.theme = theme
+        self.font_normal = font_normal
+        self.font_bold = font_bold
+
+        styles = getSampleStyleSheet()
+
+        # Garante que os estilos básicos herdam a fonte padrão configurada
+        for name in ('Normal', 'BodyText', 'Italic', 'Code', 'Bullet', 'Definition'):
+            styles[name].fontName = font_normal
+
+        styles['Title'].fontName = font_bold
+        styles['Title'].fontSize = 18
+        styles['Title'].leading = 22
+        styles['Title'].alignment = TA_CENTER
+        styles['Title'].spaceAfter = 15
+        styles['Title'].textColor = colors.black
+
+        styles.add(ParagraphStyle(name='Celula_SectionHeading',
+                                  parent=styles['Normal'],
+                                  fontName=font_bold,
+                                  fontSize=14,
+                                  leading=18,
+                                  spaceAfter=10,
+                                  textColor=theme.section_heading_color))
+
+        styles.add(ParagraphStyle(name='Celula_SubSectionHeading',
+                                  parent=styles['Normal'],
+                                  fontName=font_bold,
+                                  fontSize=12,
+                                  leading=15,
+                                  spaceAfter=7,
+                                  textColor=theme.subsection_heading_color))
+
+        styles.add(ParagraphStyle(name='Celula_NormalParagraph',
+                                  parent=styles['Normal'],
+                                  fontName=font_normal,
+                                  fontSize=10,
+                                  leading=12,
+                                  alignment=TA_LEFT,
+                                  textColor=colors.black))
+
+        styles.add(ParagraphStyle(name='Celula_SmallItalicText',
+                                  parent=styles['Normal'],
+                                  fontName=font_normal,
+                                  fontSize=9,
+                                  leading=11,
+                                  textColor=theme.muted_text_color))
+
+        self._styles = MappingProxyType(dict(styles.byName))
+
+        # Estilos para tabela
+        self.table_header_style = styles['Normal'].clone('table_header_style',
+                                                         fontName=font_bold,
+                                                         fontSize=10,
+                                                         alignment=TA_CENTER,
+                                                         textColor=theme.table_header_text_color)
+        self.table_body_style = styles['Normal'].clone('table_body_style',
+                                                       fontName=font_normal,
+                                                       fontSize=9,
+                                                       alignment=TA_LEFT,
+                                                       textColor=colors.black)
+
+        # Comandos comuns a todas as tabelas. Cada tabela cria um TableStyle
+        # filho deste (TableStyle(cmds, parent=...)), sem copiar a lista base.
+        self.table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), theme.table_header_background),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('LEFTPADDING', (0, 0), (-1, -1), 5),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+
+            ('GRID', (0, 0), (-1, -1), 0.5, theme.table_grid_color),
+            ('BOX', (0, 0), (-1, -1), 1, theme.table_box_color),
+        ])
+
+    def __getitem__(self, name):
+        return self._styles[name]
+
+    def __contains__(self, name):
+        return name in self._styles
+
+
+def get_style_registry(theme_name, font_normal, font_bold):
+    """Retorna o StyleRegistry do tema, montando-o apenas na primeira chamada
+    do processo para cada combinação de tema e fontes."""
+    theme = get_theme(theme_name)
+    key = (theme.name, font_normal, font_bold)
+    registry = _REGISTRIES.get(key)
+    if registry is None:
+        with _LOCK:
+            registry = _REGISTRIES.get(key)
+            if registry is None:
+                registry = StyleRegistry(theme, font_normal, font_bold)
+                _REGISTRIES[key] = registry
+    return registry
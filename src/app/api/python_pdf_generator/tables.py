@@ -0,0 +1,159 @@
+# src/app/api/python_pdf_generator/tables.py
+"""Tabela para relatórios grandes (milhares de linhas).
+
+A Table do ReportLab, ao ser quebrada entre páginas, recria a tabela com todas as
+linhas restantes (e a matriz de estilos de cada célula) a cada página, o que
+torna o tempo de montagem quadrático no número de linhas. A LargeTable mantém
+as linhas num iterador e, a cada página, monta uma Table apenas com as linhas
+que cabem nela, repetindo o cabeçalho.
+"""
+from collections import deque
+from itertools import chain, islice
+from xml.sax.saxutils import escape
+
+from reportlab.platypus import Flowable, Paragraph, Table, TableStyle
+
+from .autosize import AUTOSIZE_SAMPLE_ROWS, text_width
+
+# Padding das células usado pelas tabelas (ver StyleRegistry.table_style).
+CELL_HORIZONTAL_PADDING = 5 + 5
+CELL_VERTICAL_PADDING = 8 + 8
+
+
+class LargeTable(Flowable):
+    """Flowable que pagina as linhas de uma tabela sob demanda.
+
+    `rows` pode ser qualquer iterável de linhas (listas de textos já formatados).
+    Cada célula só vira Paragraph se o texto não couber numa linha da coluna;
+    caso contrário fica como string simples, que é muito mais barata de montar.
+    O texto vai escapado para o Paragraph: nos dois casos é exibido literalmente
+    (sem interpretar marcação como <b> ou &amp;).
+
+    `empty`, se informado, é o flowable desenhado no lugar da tabela quando `rows`
+    não tiver nenhuma linha (útil quando as linhas só são conhecidas durante a
+    montagem do PDF, como na ingestão em streaming).
+
+    `col_widths` pode ser uma função que recebe as primeiras linhas (até
+    AUTOSIZE_SAMPLE_ROWS) e devolve as larguras (ver autosize.py); ela só é
+    chamada na primeira diagramação, para não ler as linhas antes do doc.build.
+
+    `row_offset` é o número de linhas da tabela que vêm antes de `rows` (quando
+    a tabela é renderizada em partes, ver parallel.py), para o zebrado continuar.
+    """
+
+    def __init__(self, header_row, rows, col_widths, registry, empty=None, row_offset=0):
+        Flowable.__init__(self)
+        self.header_row = header_row
+        self.col_widths = col_widths
+        self.registry = registry
+        self._rows = iter(rows)
+        self._pending = deque()
+        self._exhausted = False
+        self._rows_emitted = row_offset  # Usado para manter a alternância do zebrado entre páginas
+        self._final_table = None
+        self._empty = empty
+
+        body_style = registry.table_body_style
+        self._body_style = body_style
+        self._text_widths = None
+        if not callable(col_widths):
+            self._set_col_widths(col_widths)
+        # Limite inferior da altura de uma linha: só os paddings
+        self._min_row_height = CELL_VERTICAL_PADDING
+
+        body_commands = [
+            ('FONTNAME', (0, 1), (-1, -1), body_style.fontName),
+            ('FONTSIZE', (0, 1), (-1, -1), body_style.fontSize),
+            ('LEADING', (0, 1), (-1, -1), body_style.leading),
+            ('TEXTCOLOR', (0, 1), (-1, -1), body_style.textColor),
+            ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
+        ]
+        backgrounds = list(registry.theme.table_row_backgrounds)
+        # Um estilo para cada paridade da primeira linha do pedaço, em vez de um
+        # comando BACKGROUND por linha.
+        self._styles = (
+            TableStyle(body_commands + [('ROWBACKGROUNDS', (0, 1), (-1, -1), backgrounds)],
+                       parent=registry.table_style),
+            TableStyle(body_commands + [('ROWBACKGROUNDS', (0, 1), (-1, -1), backgrounds[::-1])],
+                       parent=registry.table_style),
+        )
+
+    def _set_col_widths(self, col_widths):
+        self.col_widths = col_widths
+        self._text_widths = [max(w - CELL_HORIZONTAL_PADDING, 0) for w in col_widths]
+
+    def _autosize(self):
+        sample = list(islice(self._rows, AUTOSIZE_SAMPLE_ROWS))
+        self._rows = chain(sample, self._rows)
+        self._set_col_widths(self.col_widths(sample))
+
+    def _prepare_cell(self, text, col):
+        if '\n' not in text and text_width(text, self._body_style.fontName,
+                                           self._body_style.fontSize) <= self._text_widths[col]:
+            return text
+        return Paragraph(escape(text), self._body_style)
+
+    def _fill(self, count):
+        """Garante que há pelo menos `count` linhas preparadas em espera (se existirem)."""
+        pending = self._pending
+        while len(pending) < count and not self._exhausted:
+            try:
+                row = next(self._rows)
+            except StopIteration:
+                self._exhausted = True
+                break
+            pending.append([self._prepare_cell(cell, col) for col, cell in enumerate(row)])
+
+    def _max_rows_for(self, avail_height):
+        return int(avail_height // self._min_row_height) + 1
+
+    def _make_table(self, count):
+        rows = [self._pending[i] for i in range(count)]
+        t = Table([self.header_row] + rows, colWidths=self.col_widths, repeatRows=1)
+        t.setStyle(self._styles[self._rows_emitted % 2])
+        return t
+
+    def wrap(self, availWidth, availHeight):
+        if self._text_widths is None:
+            self._autosize()
+        max_rows = self._max_rows_for(availHeight)
+        self._fill(max_rows + 1)
+        if self._empty is not None and not self._pending and not self._rows_emitted:
+            # Nenhuma linha: o texto de "vazio" ocupa o lugar da tabela
+            self._final_table = self._empty
+            self.width, self.height = self._empty.wrap(availWidth, availHeight)
+        elif len(self._pending) > max_rows:
+            # Certamente não cabe: força o frame a chamar split()
+            self._final_table = None
+            self.width, self.height = sum(self.col_widths), availHeight + 1
+        else:
+            self._final_table = self._make_table(len(self._pending))
+            self.width, self.height = self._final_table.wrap(availWidth, availHeight)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        if self._text_widths is None:
+            self._autosize()
+        if self._empty is not None and self._final_table is self._empty:
+            return self._empty.split(availWidth, availHeight)
+        count = min(len(self._pending), self._max_rows_for(availHeight))
+        if count == 0:
+            return []
+        parts = self._make_table(count).split(availWidth, availHeight)
+        if not parts:
+            return []
+        first = parts[0]
+        fitted = len(first._cellvalues) - 1  # Desconta o cabeçalho
+        if fitted >= len(self._pending) and self._exhausted:
+            return [first]
+        for _ in range(fitted):
+            self._pending.popleft()
+        self._rows_emitted += fitted
+        self._final_table = None
+        # Este mesmo objeto segue como o restante da tabela; a marca de "adiado"
+        # deixada pelo doctemplate numa página anterior não vale mais.
+        self.__dict__.pop('_postponed', None)
+        return [first, self]
+
+    def draw(self):
+        self._final_table.drawOn(self.canv, 0, 0)
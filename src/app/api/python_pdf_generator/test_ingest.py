@@ -0,0 +1,124 @@
+# src/app/api/python_pdf_generator/test_ingest.py
+"""Testes da leitura incremental do corpo JSON (ingest.py).
+
+O resultado de parse_streaming(...).to_dict() tem de ser igual ao de
+json.loads para o mesmo corpo, com pedaços minúsculos (chunk_size) para que as
+fronteiras caiam dentro de strings, números e caracteres UTF-8 multibyte.
+
+Rodar a partir da raiz do projeto: python -m pytest src/app/api/python_pdf_generator
+"""
+import gzip
+import json
+import os
+import sys
+from io import BytesIO
+
+import pytest
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from python_pdf_generator.ingest import LazyArray, parse_streaming, request_body  # noqa: E402
+
+CHUNK_SIZES = (1, 2, 3, 7, 64)
+
+PAYLOAD = {
+    'type': 'faltosos',
+    'title': 'Relatório de Faltosos — Célula "Esperança" \\ 2024',
+    'content': {
+        'start_date': '2024-01-01',
+        'total': 12345678901234567890,
+        'ratio': -1.5e-10,
+        'zero': 0,
+        'flags': [True, False, None],
+        'reuniao_detalhes': {'tema': 'Fé 🙏 e 中文', 'nested': {'a': [1, {'b': []}], 'c': {}}},
+        'faltosos': [
+            {'nome': 'José Ãngelo', 'telefone': '11999990000', 'extra': {'tags': ['a', 'b'], 'x': {}}},
+            {'nome': 'Anaé \\"citação\\"', 'telefone': None, 'idade': 42},
+            {'nome': '😀' * 5, 'telefone': '', 'idade': 3.25},
+        ],
+        'visitantes': [],
+        'numeros': [1, 22, 333, 4444, 55555],
+    },
+    # Campos depois de 'content': exigem ler (e guardar) o content inteiro
+    'filename': 'faltosos.pdf',
+    'theme': {'name': 'padrao', 'cores': [1, 2]},
+}
+
+
+def _body(payload=PAYLOAD, **dumps_kwargs):
+    return json.dumps(payload, ensure_ascii=False, **dumps_kwargs).encode('utf-8')
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('dumps_kwargs', [{}, {'indent': 2}, {'separators': (',', ':')}])
+def test_to_dict_matches_json_loads(chunk_size, dumps_kwargs):
+    body = _body(**dumps_kwargs)
+    assert parse_streaming(BytesIO(body), chunk_size).to_dict() == json.loads(body)
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_number_at_chunk_boundary(chunk_size):
+    for number in ('7', '1234567', '-0.000125', '6.02e23', '123456789012345678901234567890'):
+        body = f'{{"a": {number}, "b": [{number}, {number}]}}'.encode()
+        assert parse_streaming(BytesIO(body), chunk_size).to_dict() == json.loads(body)
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_keys_after_content_while_rows_pending(chunk_size):
+    body = _body()
+    data = parse_streaming(BytesIO(body), chunk_size)
+    content = data['content']
+    rows = content['faltosos']
+    assert isinstance(rows, LazyArray)
+    # Procurar uma chave posterior lê o resto de content sem perder as linhas
+    assert data.get('filename') == 'faltosos.pdf'
+    assert data['theme'] == PAYLOAD['theme']
+    assert list(rows) == PAYLOAD['content']['faltosos']
+    assert content['numeros'] == PAYLOAD['content']['numeros']
+    assert 'inexistente' not in data
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_rows_consumed_in_order(chunk_size):
+    data = parse_streaming(BytesIO(_body()), chunk_size)
+    content = data['content']
+    assert bool(content['faltosos'])
+    assert list(content['faltosos']) == PAYLOAD['content']['faltosos']
+    assert not content['visitantes']
+    assert content['reuniao_detalhes'] == PAYLOAD['content']['reuniao_detalhes']
+
+
+def test_not_an_object():
+    assert parse_streaming(BytesIO(b'[1, 2]'), 1) is None
+    assert parse_streaming(BytesIO(b''), 1) is None
+
+
+@pytest.mark.parametrize('chunk_size', (1, 5))
+def test_truncated_body_raises(chunk_size):
+    body = _body()
+    for end in range(1, len(body)):
+        with pytest.raises(ValueError):
+            parse_streaming(BytesIO(body[:end]), chunk_size).to_dict()
+
+
+def _zstd_compress(data):
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.compress(data)
+    except ImportError:
+        zstandard = pytest.importorskip('zstandard')
+        return zstandard.ZstdCompressor().compress(data)
+
+
+@pytest.mark.parametrize('encoding, compress', [
+    ('gzip', gzip.compress),
+    ('zstd', _zstd_compress),
+])
+@pytest.mark.parametrize('chunk_size', (1, 7, 64))
+def test_compressed_body(encoding, compress, chunk_size):
+    body = _body()
+    request = Request(EnvironBuilder(method='POST', data=compress(body), content_type='application/json',
+                                     headers={'Content-Encoding': encoding}).get_environ())
+    assert parse_streaming(request_body(request), chunk_size).to_dict() == json.loads(body)
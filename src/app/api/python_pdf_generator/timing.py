@@ -0,0 +1,124 @@
+# src/app/api/python_pdf_generator/timing.py
+"""Instrumentação das requisições ao serviço de PDF.
+
+Cada requisição mede o tempo das suas etapas (leitura do JSON, montagem da
+story, doc.build, cópia do buffer...). Os tempos voltam no cabeçalho
+Server-Timing (repassado pelo proxy em generate-pdf/route.ts) e são registrados
+em uma linha de log JSON junto com o tipo do relatório, linhas e páginas.
+
+A primeira requisição de cada processo (cold start) traz também o tempo de
+importação do serviço ("import") e o tempo desde o início da importação até o
+envio dos cabeçalhos da resposta ("coldstart", importação até o primeiro byte).
+
+Com PDF_PROFILE_ENABLED=1, um payload com "profile": true gera também um dump
+do cProfile da requisição em PDF_PROFILE_DIR (padrão: diretório temporário).
+"""
+import cProfile
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_ENABLED = os.environ.get('PDF_PROFILE_ENABLED', '0') == '1'
+PROFILE_DIR = os.environ.get('PDF_PROFILE_DIR') or tempfile.gettempdir()
+
+_import_started = None
+_import_ms = None
+_cold_start_pending = True
+_cold_start_lock = threading.Lock()
+
+
+def mark_import(started):
+    """Registra a importação do serviço; `started` é o time.perf_counter() do início."""
+    global _import_started, _import_ms
+    _import_started = started
+    _import_ms = (time.perf_counter() - started) * 1000
+
+
+def _claim_cold_start():
+    global _cold_start_pending
+    with _cold_start_lock:
+        cold, _cold_start_pending = _cold_start_pending, False
+    return cold and _import_started is not None
+
+
+class RequestTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}  # Ordem de inserção = ordem das etapas
+        self.fields = {}
+        self._profiler = None
+        self.cold_start = _claim_cold_start()
+        self.import_to_first_byte_ms = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def set(self, **fields):
+        """Campos extras para o log (tipo de relatório, linhas, páginas...)."""
+        self.fields.update(fields)
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        """Valor do cabeçalho Server-Timing: "etapa;dur=ms, ..., total;dur=ms"."""
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        if self.cold_start:
+            # Chamado ao montar os cabeçalhos: é o momento do primeiro byte
+            if self.import_to_first_byte_ms is None:
+                self.import_to_first_byte_ms = (time.perf_counter() - _import_started) * 1000
+            parts.insert(0, f"import;dur={_import_ms:.1f}")
+            parts.append(f"coldstart;dur={self.import_to_first_byte_ms:.1f}")
+        return ', '.join(parts)
+
+    def log(self, event='pdf_request', **fields):
+        record = {'event': event}
+        record.update(self.fields)
+        record.update(fields)
+        record['stages_ms'] = {name: round(ms, 1) for name, ms in self.stages.items()}
+        record['total_ms'] = round(self.total_ms(), 1)
+        if self.cold_start:
+            record['cold_start'] = True
+            record['import_ms'] = round(_import_ms, 1)
+            if self.import_to_first_byte_ms is not None:
+                record['import_to_first_byte_ms'] = round(self.import_to_first_byte_ms, 1)
+        print(json.dumps(record, ensure_ascii=False, default=str))
+
+    # --- cProfile opcional ---
+
+    def start_profile(self):
+        if not PROFILE_ENABLED or self._profiler is not None:
+            return False
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        return True
+
+    def stop_profile(self, label='relatorio'):
+        """Encerra o profiling e grava o dump; retorna o caminho do arquivo."""
+        if self._profiler is None:
+            return None
+        self._profiler.disable()
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(label))
+        path = os.path.join(PROFILE_DIR, f"pdf-profile-{int(time.time() * 1000)}-{os.getpid()}-{safe_label}.prof")
+        try:
+            self._profiler.dump_stats(path)
+        except OSError as e:
+            print(f"AVISO: Não foi possível gravar o profile em {path}: {e}")
+            path = None
+        self._profiler = None
+        return path
+
+    def cancel_profile(self):
+        """Encerra o profiling sem gravar o dump (respostas que não chegaram a renderizar)."""
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler = None